@@ -1,13 +1,16 @@
 import streamlit as st
-import sounddevice as sd
-import numpy as np
+import input_devices
 import wavio
 import tempfile
 import os
 import time
-import queue
+import uuid
 import matplotlib.pyplot as plt
 from lightning_whisper_mlx import LightningWhisperMLX
+from audio_buffer import RingBuffer, BufferDrain
+from autotune import tuned_settings
+from scheduler import (JobScheduler, TranscriptionJob, SessionQueueFull, priority_for,
+                       DONE, FAILED, CANCELLED)
 
 # Page config
 st.set_page_config(
@@ -57,12 +60,30 @@ st.markdown('''
 ''', unsafe_allow_html=True)
 
 # Initialize Whisper model
+MODEL_NAME = "distil-medium.en"
+
 @st.cache_resource
 def load_whisper_model():
-    return LightningWhisperMLX(model="distil-medium.en", batch_size=12, quant=None)
+    # Run `python autotune.py --backend lightning --fixture ...` to tune these
+    tuned = tuned_settings('lightning', MODEL_NAME)
+    return LightningWhisperMLX(
+        model=MODEL_NAME,
+        batch_size=tuned.get('batch_size', 12),
+        quant=tuned.get('quant')
+    )
+
+# One inference queue shared by every browser session. It bounds how many
+# transcriptions run at once and serves sessions round-robin.
+@st.cache_resource
+def get_inference_queue():
+    return JobScheduler(
+        workers=int(os.environ.get('TRANSCRIBER_MAX_CONCURRENT', '1')),
+        max_per_session=int(os.environ.get('TRANSCRIBER_MAX_PER_SESSION', '3'))
+    )
 
 # Initialize the Whisper model
 whisper_model = load_whisper_model()
+inference_queue = get_inference_queue()
 
 # Streamlit app
 st.title("🎙️ Audio Transcription")
@@ -72,12 +93,24 @@ st.write("Click 'Start Recording' and speak into your microphone. Click 'Stop' w
 sample_rate = 44100
 
 # Initialize session state
-if 'audio_data' not in st.session_state:
-    st.session_state.audio_data = []
 if 'recording' not in st.session_state:
     st.session_state.recording = False
 if 'start_time' not in st.session_state:
     st.session_state.start_time = None
+if 'ring' not in st.session_state:
+    # Capture ring survives reruns; the drain thread keeps it from filling up
+    st.session_state.ring = RingBuffer(sample_rate * 10, channels=1)
+if 'stream' not in st.session_state:
+    st.session_state.stream = None
+if 'drain' not in st.session_state:
+    st.session_state.drain = None
+if 'session_id' not in st.session_state:
+    st.session_state.session_id = uuid.uuid4().hex
+if 'jobs' not in st.session_state:
+    # This session's transcriptions, oldest first
+    st.session_state.jobs = []
+if 'capture_summary' not in st.session_state:
+    st.session_state.capture_summary = None
 
 # Create placeholders
 status_placeholder = st.empty()
@@ -88,14 +121,6 @@ result_placeholder = st.empty()
 # Configure matplotlib
 plt.style.use('dark_background')
 
-# Audio data queue
-audio_queue = queue.Queue()
-
-def audio_callback(indata, frames, time_info, status):
-    if status:
-        print(status)
-    audio_queue.put(indata.copy())
-
 # Create columns for buttons
 col1, col2 = st.columns(2)
 
@@ -124,18 +149,22 @@ with col1:
     if st.button("🎙️ Start Recording", disabled=st.session_state.recording):
         st.session_state.recording = True
         st.session_state.start_time = time.time()
-        st.session_state.audio_data = []
         
-        # Clear previous results
-        result_placeholder.empty()
+        ring = st.session_state.ring
+        ring.clear()
+        ring.stats.reset()
         
         # Start audio stream
-        stream = sd.InputStream(
+        stream = input_devices.InputStream(
             channels=1,
             samplerate=sample_rate,
-            callback=audio_callback
+            dtype='float32',
+            callback=ring.callback
         )
+        st.session_state.drain = BufferDrain(ring)
+        st.session_state.drain.start()
         stream.start()
+        st.session_state.stream = stream
         
         # Update the UI
         st.rerun()
@@ -146,49 +175,86 @@ with col2:
         st.session_state.start_time = None
         
         # Stop the stream
+        stream = st.session_state.stream
         stream.stop()
         stream.close()
+        st.session_state.stream = None
         
-        # Process all remaining audio in queue
-        while not audio_queue.empty():
-            st.session_state.audio_data.extend(audio_queue.get()[:, 0])
+        # Collect everything captured, including what is still in the ring
+        recording = st.session_state.drain.stop()[:, 0]
+        st.session_state.drain = None
+        print(f"Capture stats: {st.session_state.ring.stats.summary()}")
         
-        # Convert to numpy array
-        recording = np.array(st.session_state.audio_data)
+        st.session_state.capture_summary = st.session_state.ring.stats.summary()
         
         if len(recording) > 0:
             # Save the recording to a temporary WAV file
             with tempfile.NamedTemporaryFile(delete=False, suffix='.wav') as temp_audio:
                 wavio.write(temp_audio.name, recording, sample_rate, sampwidth=2)
-                
-                # Transcribe the audio
-                with st.spinner("🔄 Transcribing..."):
-                    result = whisper_model.transcribe(audio_path=temp_audio.name)
-                
-                # Display the transcription
-                result_placeholder.success("✅ Transcription complete!")
-                result_placeholder.markdown("### 📝 Transcription:")
-                result_placeholder.write(result['text'])
-                
-                # Clean up
+            
+            def transcribe(job, path=temp_audio.name):
+                try:
+                    return whisper_model.transcribe(audio_path=path)['text']
+                finally:
+                    os.unlink(path)
+            
+            # Queue the transcription and return straight away; the page polls it
+            audio_seconds = len(recording) / sample_rate
+            try:
+                st.session_state.jobs.append(inference_queue.submit(TranscriptionJob(
+                    transcribe,
+                    priority=priority_for(audio_seconds),
+                    name=f"{audio_seconds:.1f}s recording",
+                    audio_seconds=audio_seconds,
+                    session=st.session_state.session_id,
+                    model=('lightning', MODEL_NAME)
+                )))
+            except SessionQueueFull as e:
                 os.unlink(temp_audio.name)
+                st.session_state.capture_summary = f"Not queued: {e}"
         
         # Update the UI
         st.rerun()
 
+# Transcriptions for this session, newest first
+pending = [job for job in st.session_state.jobs if not job.finished]
+with result_placeholder.container():
+    for job in reversed(st.session_state.jobs[-5:]):
+        if job.state == DONE:
+            st.success(f"✅ {job.name} transcribed")
+            st.markdown("### 📝 Transcription:")
+            st.write(job.result)
+        elif job.state == FAILED:
+            st.error(f"{job.name} failed: {job.error}")
+        elif job.state == CANCELLED:
+            st.info(f"{job.name} cancelled")
+        else:
+            position = inference_queue.position(job)
+            where = f"#{position} in queue" if position else f"{job.state} {job.progress_text()}"
+            st.write(f"🔄 {job.name}: {where}")
+            st.progress(job.progress)
+            if st.button("Cancel", key=f"cancel-{job.id}"):
+                job.cancel()
+                st.rerun()
+    if st.session_state.capture_summary:
+        st.caption(f"Capture: {st.session_state.capture_summary}")
+
 # Reset button
 if st.button("🔄 Reset", disabled=st.session_state.recording):
     st.session_state.recording = False
     st.session_state.start_time = None
-    st.session_state.audio_data = []
     # Clear all placeholders
     status_placeholder.empty()
     timer_placeholder.empty()
     wave_placeholder.empty()
     result_placeholder.empty()
-    # Clear the audio queue
-    while not audio_queue.empty():
-        audio_queue.get()
+    for job in pending:
+        job.cancel()
+    st.session_state.jobs = []
+    st.session_state.capture_summary = None
+    # Clear the capture ring
+    st.session_state.ring.clear()
+    st.session_state.ring.stats.reset()
     st.rerun()
 
 # Instructions
@@ -201,3 +267,8 @@ with st.expander("ℹ️ Instructions"):
     5. Wait for the transcription to complete
     6. Your transcribed text will appear below
     ''')
+
+# Poll queued transcriptions without blocking this script run
+if pending:
+    time.sleep(0.5)
+    st.rerun()
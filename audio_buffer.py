@@ -0,0 +1,155 @@
+import threading
+import time
+import numpy as np
+
+class CaptureStats:
+    """Counters updated from the audio callback and read by the UI"""
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.callbacks = 0
+        self.frames = 0
+        self.overruns = 0        # PortAudio reported input overflow
+        self.underruns = 0       # PortAudio reported input underflow
+        self.dropped_frames = 0  # Frames that did not fit in the ring
+        self.callback_time_total = 0.0
+        self.callback_time_max = 0.0
+
+    @property
+    def callback_time_mean(self):
+        return self.callback_time_total / self.callbacks if self.callbacks else 0.0
+
+    def as_dict(self):
+        return {
+            'callbacks': self.callbacks,
+            'frames': self.frames,
+            'overruns': self.overruns,
+            'underruns': self.underruns,
+            'dropped_frames': self.dropped_frames,
+            'callback_ms_mean': self.callback_time_mean * 1000,
+            'callback_ms_max': self.callback_time_max * 1000,
+        }
+
+    def summary(self):
+        return (
+            f"overruns {self.overruns}, underruns {self.underruns}, "
+            f"dropped {self.dropped_frames} frames, "
+            f"callback {self.callback_time_mean * 1000:.2f}/{self.callback_time_max * 1000:.2f} ms avg/max"
+        )
+
+class RingBuffer:
+    """Single-producer/single-consumer ring buffer for captured audio.
+
+    The producer (the PortAudio callback) only ever advances ``_write_pos``
+    and the consumer only ever advances ``_read_pos``. Both are plain ints
+    that grow monotonically, so no lock is needed and the callback copies
+    straight into preallocated storage without allocating per block.
+    """
+
+    def __init__(self, capacity, channels=1, dtype=np.float32):
+        self.capacity = int(capacity)
+        self.channels = channels
+        self.dtype = np.dtype(dtype)
+        self._data = np.zeros((self.capacity, channels), dtype=self.dtype)
+        self._write_pos = 0
+        self._read_pos = 0
+        self.stats = CaptureStats()
+
+    def available(self):
+        return self._write_pos - self._read_pos
+
+    def free(self):
+        return self.capacity - self.available()
+
+    def write(self, block):
+        # Producer side: copy as much of the block as fits, drop the rest
+        frames = len(block)
+        n = min(frames, self.free())
+        if n < frames:
+            self.stats.dropped_frames += frames - n
+        if n == 0:
+            return 0
+
+        start = self._write_pos % self.capacity
+        first = min(n, self.capacity - start)
+        self._data[start:start + first] = block[:first]
+        if first < n:
+            self._data[:n - first] = block[first:n]
+
+        # Publish only after the samples are in place
+        self._write_pos += n
+        return n
+
+    def read(self, max_frames=None, out=None):
+        # Consumer side: returns the frames that were available at call time
+        n = self.available()
+        if max_frames is not None:
+            n = min(n, max_frames)
+        if out is None:
+            out = np.empty((n, self.channels), dtype=self.dtype)
+        else:
+            n = min(n, len(out))
+
+        start = self._read_pos % self.capacity
+        first = min(n, self.capacity - start)
+        out[:first] = self._data[start:start + first]
+        if first < n:
+            out[first:n] = self._data[:n - first]
+
+        self._read_pos += n
+        return out[:n]
+
+    def clear(self):
+        self._read_pos = self._write_pos
+
+    def callback(self, indata, frames, time_info, status):
+        # Drop-in sounddevice InputStream callback
+        started = time.perf_counter()
+        if status:
+            if status.input_overflow:
+                self.stats.overruns += 1
+            if status.input_underflow:
+                self.stats.underruns += 1
+        self.write(indata)
+
+        stats = self.stats
+        elapsed = time.perf_counter() - started
+        stats.callbacks += 1
+        stats.frames += frames
+        stats.callback_time_total += elapsed
+        if elapsed > stats.callback_time_max:
+            stats.callback_time_max = elapsed
+
+class BufferDrain(threading.Thread):
+    """Background consumer that moves audio out of a RingBuffer"""
+
+    def __init__(self, ring, interval=0.05, on_chunk=None):
+        super().__init__(daemon=True)
+        self.ring = ring
+        self.interval = interval
+        self.on_chunk = on_chunk
+        self.chunks = []
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.wait(self.interval):
+            self._drain()
+
+    def _drain(self):
+        if self.ring.available():
+            chunk = self.ring.read()
+            self.chunks.append(chunk)
+            if self.on_chunk is not None:
+                self.on_chunk(chunk)
+
+    def stop(self):
+        # Stop draining and return everything captured so far
+        self._stop_event.set()
+        if self.is_alive():
+            self.join()
+        self._drain()
+        if not self.chunks:
+            return np.empty((0, self.ring.channels), dtype=self.ring.dtype)
+        return np.concatenate(self.chunks, axis=0)
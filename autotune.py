@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+import os
+import sys
+import json
+import time
+import difflib
+import argparse
+import platform
+import itertools
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from memory_budget import current_rss, total_memory, default_budget, MB
+
+# Tuned settings, keyed by machine, then backend, then model:
+#   TRANSCRIBER_TUNING_FILE=/path/to/tuning.json
+TUNING_FILE = os.environ.get(
+    'TRANSCRIBER_TUNING_FILE',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "tuning.json")
+)
+
+DEFAULT_MODELS = {
+    'lightning': 'distil-medium.en',
+    'mlx': 'mlx-community/whisper-medium-mlx',
+    'whisper': 'tiny',
+}
+
+# What the apps used before tuning; also the reference transcript
+BASELINES = {
+    'lightning': {'batch_size': 12, 'quant': None},
+    'mlx': {'fp16': True},
+    'whisper': {'fp16': False},
+}
+
+def machine_key():
+    """Stable identifier for this machine's hardware"""
+    memory = total_memory()
+    parts = [
+        platform.node(),
+        platform.system(),
+        platform.machine(),
+        platform.processor() or 'unknown-cpu',
+        f"{os.cpu_count()}cpu",
+        f"{memory // (1024 * MB)}GB" if memory else 'unknown-ram',
+    ]
+    return "/".join(parts)
+
+def load_tuning(path=TUNING_FILE):
+    try:
+        with open(path, encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def tuned_settings(backend, model, path=TUNING_FILE):
+    """Best measured settings for ``backend``/``model`` on this machine, or {}"""
+    entry = load_tuning(path).get(machine_key(), {}).get(backend, {}).get(model)
+    return dict(entry['settings']) if entry else {}
+
+def save_tuning(backend, model, settings, measurements, path=TUNING_FILE):
+    tuning = load_tuning(path)
+    tuning.setdefault(machine_key(), {}).setdefault(backend, {})[model] = {
+        'settings': settings,
+        'measured': measurements,
+        'tuned_at': datetime.now().isoformat(timespec='seconds'),
+    }
+    temp = path + '.part'
+    with open(temp, 'w', encoding='utf-8') as f:
+        json.dump(tuning, f, indent=2)
+    os.replace(temp, path)
+
+def default_grid(backend):
+    if backend == 'lightning':
+        return {'batch_size': [4, 8, 12, 16, 24], 'quant': [None, '8bit', '4bit']}
+    if backend == 'mlx':
+        return {'fp16': [True, False]}
+    # fp16 only helps (or even works) on CUDA; on CPU whisper falls back to fp32
+    try:
+        import torch
+        cuda = torch.cuda.is_available()
+    except ImportError:
+        cuda = False
+    return {'fp16': [False, True] if cuda else [False]}
+
+def candidates(grid, baseline):
+    names = sorted(grid)
+    combos = [dict(zip(names, values)) for values in itertools.product(*(grid[n] for n in names))]
+    # Run the baseline first so every other candidate can be compared to it
+    combos.sort(key=lambda settings: settings != baseline)
+    if baseline not in combos:
+        combos.insert(0, dict(baseline))
+    return combos
+
+class PeakRSS(threading.Thread):
+    """Samples process RSS; native model buffers are invisible to tracemalloc"""
+
+    def __init__(self, interval=0.02):
+        super().__init__(daemon=True)
+        self.interval = interval
+        self.peak = current_rss() or 0
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.wait(self.interval):
+            self.peak = max(self.peak, current_rss() or 0)
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+        return self.peak
+
+def _measure(backend, model, settings, fixture, repeat):
+    # Runs in a fresh process so models and peaks from other candidates don't leak in
+    sampler = PeakRSS()
+    sampler.start()
+    started = time.perf_counter()
+    if backend == 'lightning':
+        from lightning_whisper_mlx import LightningWhisperMLX
+        engine = LightningWhisperMLX(model=model, batch_size=settings['batch_size'], quant=settings['quant'])
+        run = lambda: engine.transcribe(audio_path=fixture)
+    else:
+        from backends import create_backend, load_audio
+        engine = create_backend(backend, model)
+        audio = load_audio(fixture)
+        run = lambda: engine.transcribe(audio, **settings)
+    text = None
+    decode_seconds = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        # The first run also loads the model, hence repeat=2 by default
+        text = run()['text']
+        decode_seconds = min(decode_seconds, time.perf_counter() - start)
+    total_seconds = time.perf_counter() - started
+    return {
+        'decode_seconds': decode_seconds,
+        'total_seconds': total_seconds,
+        'peak_rss_mb': sampler.stop() / MB,
+        'text': text.strip(),
+    }
+
+def measure(backend, model, settings, fixture, repeat=2):
+    context = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+        return pool.submit(_measure, backend, model, settings, fixture, repeat).result()
+
+def drift(reference, text):
+    """Share of words that differ from the reference transcript"""
+    return 1.0 - difflib.SequenceMatcher(None, reference.lower().split(), text.lower().split()).ratio()
+
+def autotune(backend, model, fixture, grid=None, budget_mb=None, max_drift=0.1, repeat=2):
+    """Measure every candidate; returns (best settings or None, result rows)"""
+    import soundfile as sf
+    audio_seconds = sf.info(fixture).duration
+    baseline = BASELINES[backend]
+    budget_mb = budget_mb or default_budget() / MB
+    rows = []
+    reference = None
+    # The baseline comes first and every other candidate's drift is measured against it
+    for settings in candidates(grid or default_grid(backend), baseline):
+        label = ", ".join(f"{k}={v}" for k, v in settings.items())
+        print(f"  {label} ...", end=" ", flush=True)
+        try:
+            result = measure(backend, model, settings, fixture, repeat)
+        except Exception as e:
+            print(f"failed: {e}")
+            rows.append({'settings': settings, 'error': str(e)})
+            if reference is None:
+                print("  The baseline failed, so accuracy drift cannot be checked; stopping")
+                return None, rows
+            continue
+        if reference is None:
+            reference = result['text']
+        result['speed'] = audio_seconds / result['decode_seconds']
+        result['drift'] = drift(reference, result['text'])
+        result['fits'] = result['peak_rss_mb'] <= budget_mb and result['drift'] <= max_drift
+        print(f"{result['speed']:.2f}x real time, peak {result['peak_rss_mb']:.0f} MB, "
+              f"drift {result['drift'] * 100:.1f}%{'' if result['fits'] else ' (rejected)'}")
+        rows.append(dict(result, settings=settings))
+    usable = [row for row in rows if row.get('fits')]
+    best = max(usable, key=lambda row: row['speed']) if usable else None
+    return best, rows
+
+def parse_list(text, convert):
+    return [None if item.lower() == 'none' else convert(item) for item in text.split(',')]
+
+def parse_bool(text):
+    return text.lower() in ('1', 'true', 'yes', 'fp16')
+
+def main():
+    parser = argparse.ArgumentParser(description="Find the fastest settings for a backend on this machine and save them")
+    parser.add_argument('--backend', default='lightning', choices=sorted(DEFAULT_MODELS))
+    parser.add_argument('--model', default=None, help="Defaults to the model the app for this backend uses")
+    parser.add_argument('--fixture', required=True, help="Speech recording to transcribe (WAV/FLAC)")
+    parser.add_argument('--batch-sizes', default=None, help="lightning: e.g. 4,8,12,16")
+    parser.add_argument('--quants', default=None, help="lightning: e.g. none,8bit,4bit")
+    parser.add_argument('--fp16', default=None, help="mlx/whisper: e.g. true,false")
+    parser.add_argument('--budget-mb', type=float, default=None,
+                        help="Reject settings whose peak RSS exceeds this (default: memory budget)")
+    parser.add_argument('--max-drift', type=float, default=0.1,
+                        help="Reject settings whose transcript differs from the baseline by more than this share of words")
+    parser.add_argument('--repeat', type=int, default=2,
+                        help="Decode the fixture this many times and keep the fastest (the first includes model loading)")
+    parser.add_argument('--dry-run', action='store_true', help="Report only; don't save the best settings")
+    args = parser.parse_args()
+
+    model = args.model or DEFAULT_MODELS[args.backend]
+    grid = default_grid(args.backend)
+    if args.batch_sizes:
+        grid['batch_size'] = parse_list(args.batch_sizes, int)
+    if args.quants:
+        grid['quant'] = parse_list(args.quants, str)
+    if args.fp16:
+        grid['fp16'] = parse_list(args.fp16, parse_bool)
+
+    print(f"Tuning {args.backend} / {model} on {machine_key()}")
+    best, rows = autotune(args.backend, model, args.fixture, grid, args.budget_mb, args.max_drift, args.repeat)
+    if best is None:
+        print("No settings ran within the memory budget and accuracy limit (or the baseline failed); nothing saved")
+        sys.exit(1)
+
+    print(f"Best: {best['settings']} at {best['speed']:.2f}x real time, peak {best['peak_rss_mb']:.0f} MB")
+    if not args.dry_run:
+        measurements = {k: best[k] for k in ('speed', 'decode_seconds', 'peak_rss_mb', 'drift')}
+        save_tuning(args.backend, model, best['settings'], measurements)
+        print(f"Saved to {TUNING_FILE}; the apps pick it up on their next start")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+import numpy as np
+import soundfile as sf
+from memory_budget import MemoryGovernor
+from autotune import tuned_settings
+from features import file_log_mel, transcribe_whisper_features, transcribe_mlx_features
+
+# Whisper models expect 16 kHz mono float32
+WHISPER_SAMPLE_RATE = 16000
+
+def resample(audio, orig_sr, target_sr=WHISPER_SAMPLE_RATE):
+    if orig_sr == target_sr:
+        return audio
+    try:
+        from scipy.signal import resample_poly
+        from math import gcd
+        g = gcd(int(orig_sr), int(target_sr))
+        return resample_poly(audio, target_sr // g, orig_sr // g).astype(np.float32)
+    except ImportError:
+        # Linear interpolation is good enough for speech when scipy is missing
+        duration = len(audio) / orig_sr
+        target_len = int(round(duration * target_sr))
+        positions = np.linspace(0, len(audio) - 1, target_len)
+        return np.interp(positions, np.arange(len(audio)), audio).astype(np.float32)
+
+def load_audio(path, sample_rate=WHISPER_SAMPLE_RATE):
+    """Read an audio file as mono float32 at ``sample_rate``"""
+    audio, file_rate = sf.read(path, dtype='float32', always_2d=True)
+    audio = audio.mean(axis=1) if audio.shape[1] > 1 else audio[:, 0]
+    return resample(audio, file_rate, sample_rate)
+
+class WhisperBackend:
+    """openai-whisper on CPU, as used by the Qt app"""
+
+    name = 'whisper'
+
+    def __init__(self, model_name='tiny', governor=None, language='en'):
+        self.model_name = model_name
+        self.governor = governor or MemoryGovernor()
+        self.language = language
+        # Saved by autotune.py for this machine, e.g. {'fp16': True} on CUDA
+        self.tuned = tuned_settings(self.name, model_name)
+
+    def load(self):
+        import whisper
+        return self.governor.get_model(self.model_name, whisper.load_model)
+
+    def transcribe(self, audio, **options):
+        options.setdefault('fp16', self.tuned.get('fp16', False))
+        options.setdefault('language', self.language)
+        return self.load().transcribe(audio, **options)
+
+    def transcribe_features(self, audio, mel, **options):
+        # Skip the front end when the log-mel was computed during capture
+        options.setdefault('fp16', self.tuned.get('fp16', False))
+        options.setdefault('language', self.language)
+        return transcribe_whisper_features(self.load(), audio, mel, **options)
+
+    def n_mels(self):
+        return self.load().dims.n_mels
+
+    def transcribe_file(self, path, **options):
+        # Streams the file through the front end instead of loading it whole
+        return self.transcribe_features(None, file_log_mel(path, self.n_mels()), **options)
+
+def load_quantized_whisper(model_name):
+    """openai-whisper model with int8 dynamically quantized linear layers, for CPU"""
+    import torch
+    import whisper
+    engines = torch.backends.quantized.supported_engines
+    # fbgemm on x86, qnnpack on ARM
+    for engine in ('fbgemm', 'x86', 'qnnpack'):
+        if engine in engines:
+            torch.backends.quantized.engine = engine
+            break
+    model = whisper.load_model(model_name, device='cpu')
+    for module in model.modules():
+        if isinstance(module, torch.nn.Linear):
+            # whisper's Linear subclass only adds a dtype cast, and
+            # quantize_dynamic swaps exact nn.Linear instances only
+            module.__class__ = torch.nn.Linear
+    # In place: a copy would hold a second float32 model at peak
+    return torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8, inplace=True)
+
+class QuantizedWhisperBackend(WhisperBackend):
+    """openai-whisper on CPU with int8 weights: smaller and usually faster than float32"""
+
+    name = 'whisper-int8'
+
+    def load(self):
+        return self.governor.get_model(f"{self.model_name}-int8",
+                                       lambda _: load_quantized_whisper(self.model_name))
+
+class MLXBackend:
+    """mlx-whisper on Apple Silicon, as used by the menu bar app"""
+
+    name = 'mlx'
+
+    def __init__(self, model_name='mlx-community/whisper-medium-mlx', governor=None, language=None):
+        self.model_name = model_name
+        self.language = language
+        self.tuned = tuned_settings(self.name, model_name)
+
+    def load(self):
+        # mlx_whisper keeps its own model cache keyed by repo
+        import mlx_whisper
+        return mlx_whisper
+
+    def transcribe(self, audio, **options):
+        if self.language:
+            options.setdefault('language', self.language)
+        for key, value in self.tuned.items():
+            options.setdefault(key, value)
+        return self.load().transcribe(audio, path_or_hf_repo=self.model_name, **options)
+
+    def transcribe_features(self, audio, mel, **options):
+        if self.language:
+            options.setdefault('language', self.language)
+        for key, value in self.tuned.items():
+            options.setdefault(key, value)
+        return transcribe_mlx_features(audio, mel, self.model_name, **options)
+
+    def n_mels(self):
+        # large-v3 models take 128 mel bins, everything else 80
+        return 128 if 'large-v3' in self.model_name else 80
+
+    def transcribe_file(self, path, **options):
+        return self.transcribe_features(None, file_log_mel(path, self.n_mels()), **options)
+
+BACKENDS = {
+    WhisperBackend.name: WhisperBackend,
+    QuantizedWhisperBackend.name: QuantizedWhisperBackend,
+    MLXBackend.name: MLXBackend,
+}
+
+def create_backend(name, model_name=None, **kwargs):
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown backend '{name}', expected one of: {', '.join(BACKENDS)}")
+    if model_name is not None:
+        kwargs['model_name'] = model_name
+    return BACKENDS[name](**kwargs)
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+import os
+import re
+import argparse
+import soundfile as sf
+from autotune import measure, drift
+
+def normalise(text):
+    return re.sub(r"[^\w\s']", " ", text.lower()).split()
+
+def word_error_rate(reference, hypothesis):
+    """Word-level edit distance divided by the reference length"""
+    ref, hyp = normalise(reference), normalise(hypothesis)
+    if not ref:
+        return 0.0 if not hyp else 1.0
+    previous = list(range(len(hyp) + 1))
+    for i, word in enumerate(ref, 1):
+        current = [i]
+        for j, other in enumerate(hyp, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (word != other)))
+        previous = current
+    return previous[-1] / len(ref)
+
+def reference_text(fixture):
+    # Same sidecar convention as the watch-folder daemon: speech.wav -> speech.txt
+    path = os.path.splitext(fixture)[0] + '.txt'
+    if os.path.exists(path):
+        with open(path, encoding='utf-8') as f:
+            return f.read()
+    return None
+
+def compare(fixtures, model, backends, repeat=2):
+    """Measure each backend on each fixture; the first backend is the baseline"""
+    rows = []
+    for fixture in fixtures:
+        seconds = sf.info(fixture).duration
+        reference = reference_text(fixture)
+        baseline = None
+        for backend in backends:
+            print(f"  {os.path.basename(fixture)} / {backend} ...", flush=True)
+            result = measure(backend, model, {}, fixture, repeat)
+            baseline = result['text'] if baseline is None else baseline
+            rows.append({
+                'fixture': fixture,
+                'backend': backend,
+                'speed': seconds / result['decode_seconds'],
+                'peak_rss_mb': result['peak_rss_mb'],
+                'wer': word_error_rate(reference, result['text']) if reference is not None else None,
+                'drift': drift(baseline, result['text']),
+            })
+    return rows
+
+def report(rows, backends):
+    print(f"\n{'Fixture':<24} {'Backend':<14} {'xRT':>6} {'Peak MB':>8} {'WER':>6} {'Drift':>6}")
+    for row in rows:
+        wer = f"{row['wer'] * 100:5.1f}%" if row['wer'] is not None else "     -"
+        print(f"{os.path.basename(row['fixture'])[:24]:<24} {row['backend']:<14} {row['speed']:6.2f} "
+              f"{row['peak_rss_mb']:8.0f} {wer} {row['drift'] * 100:5.1f}%")
+
+    print("\nMean over fixtures:")
+    for backend in backends:
+        mine = [row for row in rows if row['backend'] == backend]
+        wers = [row['wer'] for row in mine if row['wer'] is not None]
+        line = (f"  {backend:<14} {sum(r['speed'] for r in mine) / len(mine):6.2f}x real time, "
+                f"peak {max(r['peak_rss_mb'] for r in mine):.0f} MB")
+        if wers:
+            line += f", WER {sum(wers) / len(wers) * 100:.1f}%"
+        print(line)
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare int8 and float32 CPU transcription on the same fixtures")
+    parser.add_argument('fixtures', nargs='+',
+                        help="Speech recordings; a .txt next to each is used as the reference transcript")
+    parser.add_argument('--model', default='base')
+    parser.add_argument('--backends', default='whisper,whisper-int8',
+                        help="Comma-separated; the first is the baseline for drift")
+    parser.add_argument('--repeat', type=int, default=2,
+                        help="Decode each fixture this many times and keep the fastest (the first includes model loading)")
+    args = parser.parse_args()
+
+    backends = args.backends.split(',')
+    rows = compare(args.fixtures, args.model, backends, args.repeat)
+    report(rows, backends)
+
+if __name__ == "__main__":
+    main()
@@ -9,8 +9,12 @@ APP_PATH="$SCRIPT_DIR/$APP_NAME"
 mkdir -p "$APP_PATH/Contents/MacOS"
 mkdir -p "$APP_PATH/Contents/Resources"
 
-# Generate icon if it doesn't exist
-if [ ! -f "$SCRIPT_DIR/assets/AppIcon.icns" ]; then
+# Generate icon (no-op when the source icon and parameters are unchanged).
+# create_icon.py needs Pillow, which only the app's virtual environment has.
+VENV_PYTHON="$SCRIPT_DIR/.venv/bin/python"
+if [ -x "$VENV_PYTHON" ]; then
+    "$VENV_PYTHON" "$SCRIPT_DIR/create_icon.py"
+elif [ ! -f "$SCRIPT_DIR/assets/AppIcon.icns" ]; then
     echo "Generating app icon..."
     python3 "$SCRIPT_DIR/create_icon.py"
 fi
@@ -1,71 +1,143 @@
 #!/usr/bin/env python3
 import os
 import sys
+import json
+import shutil
+import hashlib
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
 from PIL import Image, ImageDraw
 
-def create_rounded_icon(input_path, output_path, corner_radius=40):
-    # Open the image
-    img = Image.open(input_path).convert('RGBA')
-    
+# Icon sizes required by macOS
+ICON_SIZES = [16, 32, 64, 128, 256, 512, 1024]
+
+# Bump when the generated output changes in a way the parameters don't capture
+PIPELINE_VERSION = 2
+
+def file_sha256(path):
+    # Hash the source in chunks so large PNGs don't have to be read at once
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 16), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def build_fingerprint(source_hash, **params):
+    # Everything that influences the output goes into the fingerprint
+    return json.dumps(
+        {'version': PIPELINE_VERSION, 'source': source_hash, 'params': params},
+        sort_keys=True
+    )
+
+def is_up_to_date(stamp_path, output_path, fingerprint):
+    if not os.path.exists(output_path) or not os.path.exists(stamp_path):
+        return False
+    with open(stamp_path) as f:
+        return f.read() == fingerprint
+
+def write_stamp(stamp_path, fingerprint):
+    with open(stamp_path, 'w') as f:
+        f.write(fingerprint)
+
+def build_pyramid(img, sizes):
+    # Resize once to the largest size, then halve successively from the
+    # previous level instead of resampling the full source for every size
+    sizes = sorted(sizes, reverse=True)
+    current = img if img.size == (sizes[0], sizes[0]) else img.resize(
+        (sizes[0], sizes[0]), Image.Resampling.LANCZOS
+    )
+    pyramid = {sizes[0]: current}
+    for size in sizes[1:]:
+        current = current.resize((size, size), Image.Resampling.LANCZOS)
+        pyramid[size] = current
+    return pyramid
+
+def iconset_entries(sizes, largest_2x=256):
+    # (file name, pixel size) pairs; @2x variants reuse the next pyramid level
+    entries = []
+    for size in sizes:
+        entries.append((f'icon_{size}x{size}.png', size))
+        if size <= largest_2x and size * 2 in sizes:
+            entries.append((f'icon_{size}x{size}@2x.png', size * 2))
+    return entries
+
+def write_images(pyramid, entries, out_dir):
+    # PNG encoding releases the GIL, so writing the files in parallel pays off
+    os.makedirs(out_dir, exist_ok=True)
+    with ThreadPoolExecutor() as pool:
+        futures = [
+            pool.submit(pyramid[size].save, os.path.join(out_dir, name), 'PNG')
+            for name, size in entries
+        ]
+        for future in futures:
+            future.result()
+
+def create_rounded_icon(img, corner_radius=40):
     # Resize to 1024x1024 (standard macOS app icon size)
-    img = img.resize((1024, 1024), Image.Resampling.LANCZOS)
-    
+    img = img.convert('RGBA').resize((1024, 1024), Image.Resampling.LANCZOS)
+
     # Create mask for rounded corners
     mask = Image.new('L', img.size, 0)
     draw = ImageDraw.Draw(mask)
     draw.rounded_rectangle([(0, 0), img.size], corner_radius, fill=255)
-    
+
     # Apply mask
     output = Image.new('RGBA', img.size, (0, 0, 0, 0))
     output.paste(img, mask=mask)
-    
-    # Save the output
-    output.save(output_path, 'PNG')
+    return output
 
-def create_icns(png_path, icns_dir):
+def create_icns(img, icns_dir, name='AppIcon'):
     # Create temporary iconset directory
-    iconset_path = os.path.join(icns_dir, 'AppIcon.iconset')
-    os.makedirs(iconset_path, exist_ok=True)
-    
-    # Icon sizes required by macOS
-    sizes = [16, 32, 64, 128, 256, 512, 1024]
-    
-    # Generate each size
-    for size in sizes:
-        img = Image.open(png_path)
-        img = img.resize((size, size), Image.Resampling.LANCZOS)
-        
-        # Save regular size
-        img.save(os.path.join(iconset_path, f'icon_{size}x{size}.png'))
-        
-        # Save @2x size (except for 1024)
-        if size < 512:
-            img = Image.open(png_path)
-            img = img.resize((size*2, size*2), Image.Resampling.LANCZOS)
-            img.save(os.path.join(iconset_path, f'icon_{size}x{size}@2x.png'))
-    
+    iconset_path = os.path.join(icns_dir, f'{name}.iconset')
+
+    # Generate each size from a single in-memory pyramid
+    pyramid = build_pyramid(img, ICON_SIZES)
+    write_images(pyramid, iconset_entries(ICON_SIZES), iconset_path)
+
     # Convert iconset to icns using iconutil
-    os.system(f'iconutil -c icns {iconset_path}')
-    
-    # Clean up iconset directory
-    os.system(f'rm -rf {iconset_path}')
+    try:
+        subprocess.run(
+            ['iconutil', '-c', 'icns', iconset_path,
+             '-o', os.path.join(icns_dir, f'{name}.icns')],
+            check=True
+        )
+    finally:
+        # Clean up iconset directory
+        shutil.rmtree(iconset_path, ignore_errors=True)
+
+def build_app_icon(input_png, icons_dir, corner_radius=40, force=False):
+    """Generate AppIcon.icns, skipping the work if nothing has changed"""
+    icns_path = os.path.join(icons_dir, 'AppIcon.icns')
+    stamp_path = os.path.join(icons_dir, '.AppIcon.icns.stamp')
+    fingerprint = build_fingerprint(
+        file_sha256(input_png),
+        corner_radius=corner_radius,
+        sizes=ICON_SIZES
+    )
+
+    if not force and is_up_to_date(stamp_path, icns_path, fingerprint):
+        return False
+
+    # Decode the source exactly once
+    with Image.open(input_png) as src:
+        rounded = create_rounded_icon(src, corner_radius)
+
+    create_icns(rounded, icons_dir)
+    write_stamp(stamp_path, fingerprint)
+    return True
 
 if __name__ == '__main__':
     # Get project root directory
     project_dir = os.path.dirname(os.path.abspath(__file__))
-    
+
     # Define paths relative to project directory
     input_png = os.path.join(project_dir, 'assets', 'audio_transcriber_icon.png')
-    rounded_png = os.path.join(project_dir, 'assets', 'audio_transcriber_icon_rounded.png')
     icons_dir = os.path.join(project_dir, 'assets')
-    
-    # Create rounded icon
-    create_rounded_icon(input_png, rounded_png)
-    
-    # Create icns file
-    create_icns(rounded_png, icons_dir)
-    
-    # Clean up rounded PNG
-    os.remove(rounded_png)
-    
-    print(f"Icon generation complete. ICNS file available at: {os.path.join(icons_dir, 'AppIcon.icns')}")
+
+    force = '--force' in sys.argv[1:]
+    icns_path = os.path.join(icons_dir, 'AppIcon.icns')
+
+    if build_app_icon(input_png, icons_dir, force=force):
+        print(f"Icon generation complete. ICNS file available at: {icns_path}")
+    else:
+        print(f"Icon is up to date, skipping generation: {icns_path}")
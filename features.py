@@ -0,0 +1,371 @@
+import queue
+import importlib
+import threading
+from contextlib import contextmanager
+import numpy as np
+
+# Whisper front-end parameters (see whisper/audio.py)
+SAMPLE_RATE = 16000
+N_FFT = 400
+HOP_LENGTH = 160
+CHUNK_LENGTH = 30
+N_SAMPLES = CHUNK_LENGTH * SAMPLE_RATE
+
+# STFT frames transformed per batch
+FRAME_BATCH = 256
+
+# Frames read from disk per block when decoding files
+FILE_BLOCK_FRAMES = 65536
+
+def mel_filters(n_mels=80, sample_rate=SAMPLE_RATE, n_fft=N_FFT):
+    """Slaney-style mel filterbank, equivalent to librosa.filters.mel"""
+    def hz_to_mel(freqs):
+        freqs = np.asarray(freqs, dtype=np.float64)
+        f_sp = 200.0 / 3
+        mels = freqs / f_sp
+        min_log_hz = 1000.0
+        min_log_mel = min_log_hz / f_sp
+        logstep = np.log(6.4) / 27.0
+        log_region = freqs >= min_log_hz
+        mels = np.where(log_region, min_log_mel + np.log(np.maximum(freqs, 1e-10) / min_log_hz) / logstep, mels)
+        return mels
+
+    def mel_to_hz(mels):
+        mels = np.asarray(mels, dtype=np.float64)
+        f_sp = 200.0 / 3
+        freqs = f_sp * mels
+        min_log_hz = 1000.0
+        min_log_mel = min_log_hz / f_sp
+        logstep = np.log(6.4) / 27.0
+        log_region = mels >= min_log_mel
+        return np.where(log_region, min_log_hz * np.exp(logstep * (mels - min_log_mel)), freqs)
+
+    fft_freqs = np.linspace(0, sample_rate / 2, 1 + n_fft // 2)
+    mel_points = mel_to_hz(np.linspace(hz_to_mel(0.0), hz_to_mel(sample_rate / 2), n_mels + 2))
+    fdiff = np.diff(mel_points)
+    ramps = mel_points[:, np.newaxis] - fft_freqs[np.newaxis, :]
+
+    lower = -ramps[:-2] / fdiff[:-1, np.newaxis]
+    upper = ramps[2:] / fdiff[1:, np.newaxis]
+    weights = np.maximum(0, np.minimum(lower, upper))
+
+    # Slaney normalisation: constant energy per channel
+    enorm = 2.0 / (mel_points[2:n_mels + 2] - mel_points[:n_mels])
+    return (weights * enorm[:, np.newaxis]).astype(np.float32)
+
+class StreamingResampler:
+    """Block-by-block resampler to 16 kHz that carries state across blocks.
+
+    Applies a windowed-sinc low-pass before linear interpolation so that
+    downsampling from 44.1/48 kHz does not alias into the speech band.
+    """
+
+    def __init__(self, orig_sr, target_sr=SAMPLE_RATE, taps=63):
+        self.orig_sr = orig_sr
+        self.target_sr = target_sr
+        self.step = orig_sr / target_sr
+        self.passthrough = orig_sr == target_sr
+        if not self.passthrough and target_sr < orig_sr:
+            cutoff = 0.5 * target_sr / orig_sr
+            n = np.arange(taps) - (taps - 1) / 2
+            kernel = 2 * cutoff * np.sinc(2 * cutoff * n) * np.hamming(taps)
+            self.kernel = (kernel / kernel.sum()).astype(np.float32)
+        else:
+            self.kernel = None
+        self._history = np.zeros(0 if self.kernel is None else len(self.kernel) - 1, dtype=np.float32)
+        # The causal FIR delays its output by half its length
+        self.delay = len(self._history) / 2
+        self._filtered = np.zeros(0, dtype=np.float32)
+        self._offset = 0               # Index of self._filtered[0]
+        self._next_pos = self.delay    # Filtered position of the next output sample
+        self._consumed = 0
+        self._emitted = 0
+
+    def process(self, block, count=True):
+        block = np.asarray(block, dtype=np.float32)
+        if self.passthrough:
+            return block
+        if count:
+            self._consumed += len(block)
+        if self.kernel is not None:
+            padded = np.concatenate((self._history, block))
+            filtered = np.convolve(padded, self.kernel, mode='valid').astype(np.float32)
+            self._history = padded[len(padded) - len(self._history):] if len(self._history) else self._history
+        else:
+            filtered = block
+        self._filtered = np.concatenate((self._filtered, filtered))
+
+        # Emit every output sample whose right neighbour is already known
+        available = self._offset + len(self._filtered) - 1
+        if self._next_pos > available:
+            return np.zeros(0, dtype=np.float32)
+        positions = np.arange(self._next_pos, available, self.step)
+        local = positions - self._offset
+        out = np.interp(local, np.arange(len(self._filtered)), self._filtered).astype(np.float32)
+        if len(positions):
+            self._next_pos = positions[-1] + self.step
+
+        # Keep only what the next call can still need
+        keep_from = max(int(np.floor(self._next_pos)) - self._offset - 1, 0)
+        self._filtered = self._filtered[keep_from:]
+        self._offset += keep_from
+        self._emitted += len(out)
+        return out
+
+    def flush(self):
+        # Push out the samples still held back by the filter delay
+        if self.passthrough:
+            return np.zeros(0, dtype=np.float32)
+        remaining = int(np.ceil(self._consumed / self.step)) - self._emitted
+        out = self.process(np.zeros(int(np.ceil(self.delay)) + 2, dtype=np.float32), count=False)
+        return out[:max(remaining, 0)]
+
+class IncrementalLogMel:
+    """Computes Whisper-compatible log-mel frames as audio arrives.
+
+    Produces the same frames as ``whisper.log_mel_spectrogram(audio,
+    padding=N_SAMPLES)``: a centred, periodic-Hann STFT with reflect
+    padding at the start. Frames are computed in vectorised batches; only
+    the global max clamp and scaling are left for ``finish``.
+    """
+
+    def __init__(self, n_mels=80):
+        self.n_mels = n_mels
+        self.filters = mel_filters(n_mels)
+        self.window = (0.5 - 0.5 * np.cos(2 * np.pi * np.arange(N_FFT) / N_FFT)).astype(np.float32)
+        self._pending = np.zeros(0, dtype=np.float32)  # Padded signal not yet fully framed
+        self._head = np.zeros(0, dtype=np.float32)     # First samples, until reflect padding is known
+        self._started = False
+        self._frames = []
+        self.samples = 0
+
+    def _emit(self, final=False):
+        usable = len(self._pending) - N_FFT
+        if usable < 0:
+            return
+        count = usable // HOP_LENGTH + 1
+        if final:
+            # torch.stft(center=True) has one frame more, which Whisper drops
+            count = min(count, self._expected_frames() - self._frame_count())
+        if count <= 0:
+            return
+        # Strided view instead of an index array; batches bound the FFT scratch
+        windows = np.lib.stride_tricks.sliding_window_view(self._pending, N_FFT)[::HOP_LENGTH]
+        for start in range(0, count, FRAME_BATCH):
+            frames = windows[start:min(start + FRAME_BATCH, count)] * self.window
+            magnitudes = np.abs(np.fft.rfft(frames, axis=1)) ** 2
+            mel = magnitudes.astype(np.float32) @ self.filters.T
+            self._frames.append(np.log10(np.maximum(mel, 1e-10)))
+        self._pending = self._pending[count * HOP_LENGTH:]
+
+    def _frame_count(self):
+        return sum(len(f) for f in self._frames)
+
+    def _expected_frames(self):
+        return (self.samples + N_SAMPLES) // HOP_LENGTH
+
+    def feed(self, block):
+        block = np.asarray(block, dtype=np.float32)
+        self.samples += len(block)
+        if not self._started:
+            self._head = np.concatenate((self._head, block))
+            if len(self._head) <= N_FFT // 2:
+                return
+            self._start(self._head)
+            self._head = None
+            return
+        self._pending = np.concatenate((self._pending, block))
+        self._emit()
+
+    def _start(self, signal):
+        # Reflect-pad the beginning exactly like torch.stft(center=True)
+        prefix = signal[1:N_FFT // 2 + 1][::-1]
+        self._pending = np.concatenate((prefix, signal))
+        self._started = True
+        self._emit()
+
+    def finish(self):
+        """Return the normalised (n_mels, frames) log-mel spectrogram"""
+        tail = np.zeros(N_SAMPLES + N_FFT // 2, dtype=np.float32)
+        if not self._started:
+            self._start(np.concatenate((self._head, tail[:N_SAMPLES])))
+            self._pending = np.concatenate((self._pending, tail[N_SAMPLES:]))
+        else:
+            self._pending = np.concatenate((self._pending, tail))
+        self._emit(final=True)
+
+        if not self._frames:
+            return np.zeros((self.n_mels, 0), np.float32)
+        # Normalise in place so a long file never holds more than two copies
+        frames = np.concatenate(self._frames, axis=0)
+        self._frames = []
+        log_spec = np.ascontiguousarray(frames.T, dtype=np.float32)
+        del frames
+        np.maximum(log_spec, log_spec.max() - 8.0, out=log_spec)
+        log_spec += 4.0
+        log_spec /= 4.0
+        return log_spec
+
+class FeatureStream:
+    """Resamples and extracts log-mel features on a background thread.
+
+    ``feed`` is cheap and safe to call from the capture drain; ``finish``
+    waits for the backlog and returns the 16 kHz audio and its features.
+    """
+
+    def __init__(self, sample_rate, n_mels=80):
+        self.resampler = StreamingResampler(sample_rate)
+        self.extractor = IncrementalLogMel(n_mels)
+        self.audio_chunks = []
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    @property
+    def n_mels(self):
+        return self.extractor.n_mels
+
+    def feed(self, block):
+        self._queue.put(np.asarray(block, dtype=np.float32).reshape(-1))
+
+    def _run(self):
+        while True:
+            block = self._queue.get()
+            if block is None:
+                return
+            self._extract(self.resampler.process(block))
+
+    def _extract(self, audio):
+        if len(audio):
+            self.audio_chunks.append(audio)
+            self.extractor.feed(audio)
+
+    def finish(self):
+        self._queue.put(None)
+        self._thread.join()
+        self._extract(self.resampler.flush())
+        audio = np.concatenate(self.audio_chunks) if self.audio_chunks else np.zeros(0, np.float32)
+        return audio, self.extractor.finish()
+
+def read_blocks(path, blocksize=FILE_BLOCK_FRAMES, sample_rate=SAMPLE_RATE):
+    """Yield an audio file as mono float32 blocks at ``sample_rate``.
+
+    Reads straight into one reusable float32 buffer and downmixes and
+    resamples block by block, so memory stays proportional to
+    ``blocksize`` however long the file is.
+    """
+    import soundfile as sf
+    with sf.SoundFile(path) as f:
+        resampler = StreamingResampler(f.samplerate, sample_rate)
+        buffer = np.empty((blocksize, f.channels), dtype=np.float32)
+        mono = np.empty(blocksize, dtype=np.float32)
+        while True:
+            block = f.read(dtype='float32', always_2d=True, out=buffer)
+            if not len(block):
+                break
+            if f.channels > 1:
+                block = np.mean(block, axis=1, out=mono[:len(block)])
+            else:
+                block = block[:, 0]
+            out = resampler.process(block)
+            if resampler.passthrough:
+                # Still a view of the read buffer, which the next read overwrites
+                out = out.copy()
+            if len(out):
+                yield out
+        tail = resampler.flush()
+        if len(tail):
+            yield tail
+
+def file_log_mel(path, n_mels=80, blocksize=FILE_BLOCK_FRAMES):
+    """Stream a file through the front end; returns its (n_mels, frames) log-mel"""
+    extractor = IncrementalLogMel(n_mels)
+    for block in read_blocks(path, blocksize):
+        extractor.feed(block)
+    return extractor.finish()
+
+def audio_log_mel(audio, sample_rate=SAMPLE_RATE, n_mels=80):
+    """(n_mels, frames) log-mel of an in-memory mono recording at ``sample_rate``"""
+    resampler = StreamingResampler(sample_rate)
+    extractor = IncrementalLogMel(n_mels)
+    extractor.feed(resampler.process(audio))
+    extractor.feed(resampler.flush())
+    return extractor.finish()
+
+# Backends compute the mel inside transcribe(). While any precomputed
+# spectrogram is in use, the backend module's log_mel_spectrogram is a
+# dispatcher that answers registered audio objects from their mel and
+# computes everything else. Nothing is held while decoding, so a job
+# paused in its progress hook can run another one inline on any thread.
+_registry_lock = threading.Lock()
+_precomputed = {}  # id(source) -> (source, mel, convert, placeholder)
+_installed = {}    # module name -> [original log_mel_spectrogram, registrations]
+
+def _dispatcher(original):
+    def log_mel_spectrogram(audio, n_mels=80, padding=0, *args, **kwargs):
+        n_mels = kwargs.pop('n_mels', n_mels)
+        entry = _precomputed.get(id(audio))
+        if entry is not None and entry[0] is audio:
+            _, mel, convert, placeholder = entry
+            if n_mels == mel.shape[0] and padding == N_SAMPLES:
+                return convert(mel)
+            if placeholder:
+                raise ValueError(f"Precomputed log-mel has {mel.shape[0]} bins, the model expects {n_mels}")
+        return original(audio, n_mels, padding, *args, **kwargs)
+    return log_mel_spectrogram
+
+@contextmanager
+def precomputed_mel(module, audio, mel, convert):
+    """Make ``module.log_mel_spectrogram`` return ``mel`` for the audio this yields.
+
+    Yields the object to pass to the backend's transcribe(): a new view of
+    ``audio``, or a new zero-length placeholder when only the mel was kept
+    (the backends use the audio for nothing but the log_mel_spectrogram
+    call). Only the full-length call on exactly that object is answered
+    from ``mel``, so jobs run inline or alongside never get each other's.
+    """
+    source = np.zeros(0, dtype=np.float32) if audio is None else audio.view()
+    name = module.__name__
+    with _registry_lock:
+        if name not in _installed:
+            original = getattr(module, 'log_mel_spectrogram', None)
+            if original is not None:
+                _installed[name] = [original, 0]
+                module.log_mel_spectrogram = _dispatcher(original)
+        registered = name in _installed
+        if registered:
+            _installed[name][1] += 1
+            _precomputed[id(source)] = (source, mel, convert, audio is None)
+    if not registered:
+        if audio is None:
+            raise RuntimeError(f"{name} has no log_mel_spectrogram to override")
+        # Backend no longer exposes the hook; let it compute the mel itself
+        yield source
+        return
+
+    try:
+        yield source
+    finally:
+        with _registry_lock:
+            del _precomputed[id(source)]
+            _installed[name][1] -= 1
+            if not _installed[name][1]:
+                module.log_mel_spectrogram = _installed.pop(name)[0]
+
+def transcribe_whisper_features(model, audio, mel, **options):
+    """openai-whisper: decode with a precomputed (n_mels, frames) spectrogram.
+
+    ``audio`` may be None when only the spectrogram was kept.
+    """
+    import torch
+    # whisper/__init__ re-exports transcribe(), shadowing the submodule name
+    whisper_transcribe = importlib.import_module('whisper.transcribe')
+    with precomputed_mel(whisper_transcribe, audio, mel, lambda m: torch.from_numpy(m).to(model.device)) as source:
+        return model.transcribe(source, **options)
+
+def transcribe_mlx_features(audio, mel, path_or_hf_repo, **options):
+    """mlx-whisper: its spectrogram is (frames, n_mels), so transpose"""
+    import mlx.core as mx
+    mlx_transcribe = importlib.import_module('mlx_whisper.transcribe')
+    with precomputed_mel(mlx_transcribe, audio, mel, lambda m: mx.array(m.T)) as source:
+        return mlx_transcribe.transcribe(source, path_or_hf_repo=path_or_hf_repo, **options)
@@ -0,0 +1,380 @@
+import queue
+import itertools
+import threading
+import traceback
+import multiprocessing
+from multiprocessing import shared_memory
+from contextlib import contextmanager, nullcontext
+import numpy as np
+from profiling import profile_job, profiling_enabled
+
+# Protocol (tuples over one duplex pipe):
+#   parent -> child  ('transcribe', request) | ('continue',) | ('cancel',) | ('stop',)
+#   child -> parent  ('status', id, text) | ('segments', id, [segment, ...])
+#                    ('memory', id, text) | ('progress', id, done, total)
+#                    ('result', id, result) | ('error', id, message, trace) | ('cancelled', id)
+# Every 'progress' waits for 'continue' or 'cancel'. While it waits the
+# child also accepts a nested 'transcribe', which is how a paused batch
+# job lets an interactive one run inline (see scheduler.py).
+
+class WorkerError(Exception):
+    pass
+
+class WorkerCrashed(WorkerError):
+    pass
+
+class _Cancelled(Exception):
+    pass
+
+def _attach(name):
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        # Python < 3.13 always tracks; the spawned child shares the parent's
+        # resource tracker, so the parent's unlink() still cleans up once
+        return shared_memory.SharedMemory(name=name)
+
+@contextmanager
+def shared_array(shape, dtype=np.float32):
+    """A numpy array backed by a new shared-memory segment"""
+    dtype = np.dtype(dtype)
+    size = max(int(np.prod(shape)) * dtype.itemsize, 1)
+    shm = shared_memory.SharedMemory(create=True, size=size)
+    array = np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+    try:
+        yield shm, array
+    finally:
+        del array
+        shm.close()
+        shm.unlink()
+
+def _describe(shm, array):
+    return {'shm': shm.name, 'shape': array.shape, 'dtype': array.dtype.str}
+
+# ---------------------------------------------------------------------------
+# Child process
+
+class _Server:
+    def __init__(self, conn, budget=None):
+        self.conn = conn
+        # Models stay resident here between requests, within the worker's
+        # share of the budget
+        from memory_budget import MemoryGovernor
+        self.governor = MemoryGovernor(budget)
+        self.backends = {}
+
+    def backend(self, name, model_name):
+        from backends import create_backend
+        key = (name, model_name)
+        if key not in self.backends:
+            self.backends[key] = create_backend(name, model_name, governor=self.governor)
+        return self.backends[key]
+
+    def serve(self):
+        while True:
+            try:
+                message = self.conn.recv()
+            except EOFError:
+                return
+            if message[0] == 'stop':
+                return
+            if message[0] == 'transcribe':
+                self.handle(message[1])
+            # A late 'continue' or 'cancel' for a finished request is ignored
+
+    def handle(self, request):
+        job_id = request['id']
+        events = queue.Queue()
+        cancelled = threading.Event()
+
+        def exchange(done, total):
+            # Called from any decode thread; the handling thread owns the pipe
+            if cancelled.is_set():
+                raise _Cancelled()
+            reply = queue.Queue(maxsize=1)
+            events.put(('progress', done, total, reply))
+            if reply.get() == 'cancel':
+                raise _Cancelled()
+
+        def status(text):
+            events.put(('status', text))
+
+        def segments(new):
+            events.put(('segments', new))
+
+        def body():
+            try:
+                with self.profile(request) as profile:
+                    result = self.run(request, exchange, status, segments)
+                if profile is not None:
+                    result = dict(result, profile=profile.path, profile_summary=profile.summary())
+                events.put(('result', result))
+            except _Cancelled:
+                events.put(('cancelled',))
+            except Exception as e:
+                events.put(('error', str(e), traceback.format_exc()))
+
+        threading.Thread(target=body, daemon=True, name=f"request-{job_id}").start()
+        while True:
+            event = events.get()
+            kind = event[0]
+            if kind in ('status', 'segments'):
+                self.conn.send((kind, job_id, event[1]))
+            elif kind == 'progress':
+                _, done, total, reply = event
+                reply.put(self.checkpoint(job_id, done, total, cancelled))
+            else:
+                self.send_memory(job_id)
+                if kind == 'result':
+                    self.conn.send(('result', job_id, event[1]))
+                elif kind == 'cancelled':
+                    self.conn.send(('cancelled', job_id))
+                else:
+                    self.conn.send(('error', job_id, event[1], event[2]))
+                return
+
+    def send_memory(self, job_id):
+        # The GUI shows this process's RSS and models, not its own
+        self.conn.send(('memory', job_id, self.governor.status_text()))
+
+    def profile(self, request):
+        # Profiled here, where the decode actually runs
+        if not request.get('profile'):
+            return nullcontext()
+        return profile_job(f"transcribe_{request['backend']}_{request['model']}", force=True)
+
+    def checkpoint(self, job_id, done, total, cancelled):
+        if cancelled.is_set():
+            return 'cancel'
+        self.send_memory(job_id)
+        self.conn.send(('progress', job_id, done, total))
+        while True:
+            message = self.conn.recv()
+            if message[0] == 'transcribe':
+                # Runs to completion before this request resumes
+                self.handle(message[1])
+            elif message[0] == 'cancel':
+                cancelled.set()
+                return 'cancel'
+            else:
+                return 'continue'
+
+    def run(self, request, exchange, status, segments):
+        from progress import watch_progress
+        from features import audio_log_mel
+        from multichannel import transcribe_channels, format_transcript
+
+        status("Loading model...")
+        backend = self.backend(request['backend'], request['model'])
+        backend.load()
+        options = request['options']
+        kind = request['kind']
+
+        if kind == 'file':
+            # Front end runs here too, so the GUI process never touches the samples
+            status("Transcribing...")
+            with watch_progress(exchange, segments):
+                return backend.transcribe_file(request['path'], **options)
+
+        shm = _attach(request['shm'])
+        try:
+            array = np.ndarray(request['shape'], dtype=request['dtype'], buffer=shm.buf)
+            if kind == 'mel':
+                status("Transcribing...")
+                with watch_progress(exchange, segments):
+                    return backend.transcribe_features(None, array, **options)
+            if kind == 'channels':
+                status(f"Transcribing {array.shape[1]} channels...")
+
+                n_mels = backend.n_mels()
+
+                def transcribe_channel(mel):
+                    # Per-channel progress is not meaningful overall, only cancellation
+                    with watch_progress(lambda done, total: exchange(None, None)):
+                        return backend.transcribe_features(None, mel, **options)
+
+                segments = transcribe_channels(array, transcribe_channel,
+                                               front_end=lambda mono: audio_log_mel(mono, n_mels=n_mels))
+                return {'text': format_transcript(segments), 'segments': segments}
+            raise WorkerError(f"Unknown request kind '{kind}'")
+        finally:
+            array = None
+            try:
+                shm.close()
+            except BufferError:
+                # A tensor still views the buffer; it is released with it
+                pass
+
+def _serve(conn, budget):
+    _Server(conn, budget).serve()
+
+# ---------------------------------------------------------------------------
+# Parent process
+
+class InferenceWorker:
+    """Runs transcriptions in a long-lived child process.
+
+    The child keeps models resident between requests, so a Whisper OOM or
+    native crash only kills the worker; it is restarted and the request
+    that was running fails with WorkerCrashed. Audio and spectrograms are
+    handed over in shared memory rather than pickled. ``budget`` is the
+    child's memory budget in bytes (default: its own default_budget()).
+    """
+
+    def __init__(self, backend='whisper', budget=None):
+        self.backend = backend
+        self.budget = budget
+        self.process = None
+        self.conn = None
+        self.restarts = 0
+        # Last governor status reported by the child
+        self.memory_text = None
+        self._ctx = multiprocessing.get_context('spawn')
+        self._ids = itertools.count(1)
+        # Re-entrant: a job run inline from a progress callback uses it too
+        self._lock = threading.RLock()
+        # stop() must not wait for _lock, which a running request holds
+        self._stopping = threading.Event()
+
+    @property
+    def alive(self):
+        return self.process is not None and self.process.is_alive()
+
+    def start(self):
+        with self._lock:
+            self._stopping.clear()
+            if self.alive:
+                return
+            parent_conn, child_conn = self._ctx.Pipe()
+            self.memory_text = None
+            self.process = self._ctx.Process(target=_serve, args=(child_conn, self.budget),
+                                             daemon=True, name="inference-worker")
+            self.process.start()
+            child_conn.close()
+            self.conn = parent_conn
+
+    def stop(self, timeout=5.0):
+        """Shut the worker down without waiting for a running request.
+
+        A request in progress fails with WorkerError in its own thread.
+        """
+        self._stopping.set()
+        process, conn = self.process, self.conn
+        if process is not None and process.is_alive():
+            # Ask politely only when idle; the pipe belongs to a running request
+            if self._lock.acquire(blocking=False):
+                try:
+                    conn.send(('stop',))
+                except (OSError, BrokenPipeError):
+                    pass
+                finally:
+                    self._lock.release()
+                process.join(timeout)
+            if process.is_alive():
+                process.terminate()
+                process.join(timeout)
+        self.process = None
+
+    def status_text(self):
+        if not self.alive:
+            return "Worker: stopped"
+        text = f"Worker: pid {self.process.pid}"
+        if self.restarts:
+            text += f", restarted {self.restarts}x"
+        if self.memory_text:
+            text += f", {self.memory_text}"
+        return text
+
+    def _ensure_running(self):
+        if not self.alive:
+            if self.process is not None:
+                self.restarts += 1
+            self.start()
+
+    def transcribe_file(self, model_name, path, on_progress=None, on_status=None,
+                        on_segments=None, backend=None, **options):
+        return self._call({'kind': 'file', 'path': path}, model_name, options, on_progress, on_status, on_segments, backend)
+
+    def transcribe_mel(self, model_name, mel, on_progress=None, on_status=None,
+                       on_segments=None, backend=None, **options):
+        with shared_array(mel.shape, mel.dtype) as (shm, array):
+            array[...] = mel
+            request = dict(_describe(shm, array), kind='mel')
+            return self._call(request, model_name, options, on_progress, on_status, on_segments, backend)
+
+    def transcribe_channels(self, model_name, path, on_progress=None, on_status=None,
+                            on_segments=None, backend=None, **options):
+        # Read the file straight into shared memory: one copy, no pickling
+        import soundfile as sf
+        with sf.SoundFile(path) as f:
+            with shared_array((f.frames, f.channels)) as (shm, array):
+                f.read(dtype='float32', always_2d=True, out=array)
+                request = dict(_describe(shm, array), kind='channels')
+                return self._call(request, model_name, options, on_progress, on_status, on_segments, backend)
+
+    def _call(self, request, model_name, options, on_progress, on_status, on_segments, backend):
+        with self._lock:
+            self._ensure_running()
+            request = dict(request, id=next(self._ids), backend=backend or self.backend,
+                           model=model_name, options=options, profile=profiling_enabled())
+            process, conn = self.process, self.conn
+            conn.send(('transcribe', request))
+            return self._wait(request['id'], process, conn, on_progress, on_status, on_segments)
+
+    def _wait(self, job_id, process, conn, on_progress, on_status, on_segments):
+        error = None
+        while True:
+            message = self._recv(process, conn)
+            kind = message[0]
+            if kind == 'status':
+                if on_status is not None:
+                    on_status(message[2])
+            elif kind == 'segments':
+                if on_segments is not None:
+                    on_segments(message[2])
+            elif kind == 'memory':
+                self.memory_text = message[2]
+            elif kind == 'progress':
+                if error is None and on_progress is not None:
+                    try:
+                        # May raise (e.g. JobCancelled) or run another job inline
+                        on_progress(message[2], message[3])
+                    except Exception as e:
+                        error = e
+                try:
+                    conn.send(('cancel',) if error is not None else ('continue',))
+                except OSError:
+                    self._crashed(process)
+            elif kind == 'result':
+                if error is not None:
+                    raise error
+                return message[2]
+            elif kind == 'cancelled':
+                raise error or WorkerError("Cancelled")
+            else:
+                raise WorkerError(f"{message[2]}\nWorker traceback: {message[3]}")
+
+    def _recv(self, process, conn):
+        while True:
+            if self._stopping.is_set():
+                raise WorkerError("Inference worker was stopped")
+            try:
+                if conn.poll(0.2):
+                    return conn.recv()
+            except (EOFError, OSError):
+                self._crashed(process)
+            if not process.is_alive():
+                self._crashed(process)
+
+    def _crashed(self, process):
+        if self._stopping.is_set():
+            raise WorkerError("Inference worker was stopped")
+        process.join(1.0)
+        code = process.exitcode
+        with self._lock:
+            if process is self.process:
+                # Restart now so the next request does not wait for the spawn
+                self.process = None
+                self.restarts += 1
+                self.start()
+        raise WorkerCrashed(f"Inference worker exited unexpectedly (exit code {code}); it has been restarted")
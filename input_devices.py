@@ -0,0 +1,228 @@
+import os
+import threading
+import time
+import numpy as np
+
+try:
+    import sounddevice as sd
+except (ImportError, OSError):
+    # No PortAudio (e.g. a headless CI box); only simulated input works
+    sd = None
+
+class SimulatedStatus:
+    """Stand-in for sounddevice.CallbackFlags"""
+
+    def __init__(self, input_overflow=False, input_underflow=False):
+        self.input_overflow = input_overflow
+        self.input_underflow = input_underflow
+
+    def __bool__(self):
+        return self.input_overflow or self.input_underflow
+
+    def __str__(self):
+        flags = [name for name in ('input_overflow', 'input_underflow') if getattr(self, name)]
+        return ', '.join(flags)
+
+class SineSource:
+    def __init__(self, frequency=440.0, amplitude=0.1):
+        self.frequency = frequency
+        self.amplitude = amplitude
+        self.position = 0
+
+    def read(self, frames, channels, sample_rate):
+        t = (self.position + np.arange(frames)) / sample_rate
+        self.position += frames
+        tone = (self.amplitude * np.sin(2 * np.pi * self.frequency * t)).astype(np.float32)
+        return np.repeat(tone[:, np.newaxis], channels, axis=1)
+
+class NoiseSource:
+    def __init__(self, amplitude=0.05, seed=None):
+        self.amplitude = amplitude
+        self.rng = np.random.default_rng(seed)
+
+    def read(self, frames, channels, sample_rate):
+        return (self.amplitude * self.rng.standard_normal((frames, channels))).astype(np.float32)
+
+class SilenceSource:
+    def read(self, frames, channels, sample_rate):
+        return np.zeros((frames, channels), dtype=np.float32)
+
+class WavSource:
+    """Replays a fixture file, looping by default"""
+
+    def __init__(self, path, loop=True):
+        self.path = path
+        self.loop = loop
+        self._audio = None
+        self._rate = None
+        self.position = 0
+
+    def _load(self, channels, sample_rate):
+        import soundfile as sf
+        from backends import resample
+        audio, rate = sf.read(self.path, dtype='float32', always_2d=True)
+        if rate != sample_rate:
+            audio = np.stack([resample(audio[:, c], rate, sample_rate) for c in range(audio.shape[1])], axis=1)
+        # Match the requested channel count by duplicating or truncating
+        if audio.shape[1] < channels:
+            audio = np.tile(audio, (1, -(-channels // audio.shape[1])))
+        self._audio = np.ascontiguousarray(audio[:, :channels], dtype=np.float32)
+        self._rate = sample_rate
+
+    def read(self, frames, channels, sample_rate):
+        if self._audio is None or self._rate != sample_rate or self._audio.shape[1] != channels:
+            self._load(channels, sample_rate)
+        out = np.zeros((frames, channels), dtype=np.float32)
+        filled = 0
+        while filled < frames:
+            if self.position >= len(self._audio):
+                if not self.loop or len(self._audio) == 0:
+                    break
+                self.position = 0
+            n = min(frames - filled, len(self._audio) - self.position)
+            out[filled:filled + n] = self._audio[self.position:self.position + n]
+            filled += n
+            self.position += n
+        return out
+
+def parse_source(spec):
+    """'sine', 'sine:220', 'noise', 'silence' or a path to an audio file"""
+    name, _, arg = spec.partition(':')
+    if name == 'sine':
+        return SineSource(float(arg) if arg else 440.0)
+    if name == 'noise':
+        return NoiseSource()
+    if name == 'silence':
+        return SilenceSource()
+    return WavSource(spec)
+
+class SimulatedInputStream:
+    """Drop-in replacement for the parts of sounddevice.InputStream we use.
+
+    Blocks come from ``source`` at ``speed`` times real time (``speed=0``
+    runs as fast as possible). Supports both callback mode and blocking
+    ``read``; after ``duration`` seconds of audio the stream runs dry and
+    ``finished`` is set.
+    """
+
+    def __init__(self, samplerate=44100, channels=1, dtype='float32', callback=None,
+                 blocksize=None, device=None, latency=None, source=None, speed=1.0,
+                 duration=None):
+        self.samplerate = samplerate
+        self.channels = channels
+        self.dtype = np.dtype(dtype)
+        self.callback = callback
+        self.blocksize = blocksize or 512
+        self.device = device
+        self.source = source or SineSource()
+        self.speed = speed
+        self.total_frames = int(duration * samplerate) if duration else None
+        self.frames_delivered = 0
+        self.overflows = 0
+        self.finished = threading.Event()
+        self.active = False
+        self._thread = None
+        self._started_at = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+        self.close()
+
+    def _next_block(self, frames):
+        if self.total_frames is not None:
+            frames = min(frames, self.total_frames - self.frames_delivered)
+        if frames <= 0:
+            self.finished.set()
+            return None
+        block = self.source.read(frames, self.channels, self.samplerate).astype(self.dtype, copy=False)
+        self.frames_delivered += frames
+        return block
+
+    def _wait_until(self, frames):
+        # Pace delivery so frame N is available at N / (rate * speed) seconds
+        if self.speed <= 0:
+            return 0.0
+        due = self._started_at + frames / (self.samplerate * self.speed)
+        delay = due - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        return -delay
+
+    def _run(self):
+        while self.active:
+            late = self._wait_until(self.frames_delivered + self.blocksize)
+            block = self._next_block(self.blocksize)
+            if block is None:
+                return
+            # Report an overflow if we fell more than a block behind, like
+            # PortAudio; ``late`` is wall time, so scale the block by the speed
+            overflow = self.speed > 0 and late > self.blocksize / (self.samplerate * self.speed)
+            if overflow:
+                self.overflows += 1
+            self.callback(block, len(block), None, SimulatedStatus(input_overflow=overflow))
+
+    def start(self):
+        self.active = True
+        self._started_at = time.perf_counter()
+        if self.callback is not None:
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self.active = False
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join()
+        self._thread = None
+
+    def close(self):
+        self.active = False
+
+    def read(self, frames):
+        self._wait_until(self.frames_delivered + frames)
+        block = self._next_block(frames)
+        if block is None:
+            block = np.zeros((0, self.channels), dtype=self.dtype)
+        return block, False
+
+# Process-wide simulated input, set programmatically or from the environment:
+#   TRANSCRIBER_SIMULATED_INPUT=sine|noise|silence|path/to/fixture.wav
+#   TRANSCRIBER_SIMULATED_SPEED=1.0
+_simulated = None
+
+def use_simulated_input(source, speed=1.0):
+    global _simulated
+    _simulated = (parse_source(source) if isinstance(source, str) else source, speed)
+
+def use_real_input():
+    global _simulated
+    _simulated = None
+
+if os.environ.get('TRANSCRIBER_SIMULATED_INPUT'):
+    use_simulated_input(
+        os.environ['TRANSCRIBER_SIMULATED_INPUT'],
+        float(os.environ.get('TRANSCRIBER_SIMULATED_SPEED', '1.0'))
+    )
+
+def is_simulated():
+    return _simulated is not None or sd is None
+
+def InputStream(**kwargs):
+    """Open the configured input: sounddevice, or the simulated device"""
+    if _simulated is not None:
+        source, speed = _simulated
+        kwargs.setdefault('source', source)
+        kwargs.setdefault('speed', speed)
+        return SimulatedInputStream(**kwargs)
+    if sd is None:
+        raise OSError("PortAudio is not available; set TRANSCRIBER_SIMULATED_INPUT to use a simulated device")
+    return sd.InputStream(**kwargs)
+
+def query_input_channels(device=None):
+    if _simulated is not None or sd is None:
+        # Simulated device behaves like a stereo interface
+        return 2
+    return sd.query_devices(device, kind='input')['max_input_channels']
@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+import time
+import argparse
+import threading
+import numpy as np
+from audio_buffer import RingBuffer, BufferDrain
+from input_devices import SimulatedInputStream, parse_source
+from scheduler import JobScheduler, TranscriptionJob
+
+class NullBackend:
+    """Pretends to decode at a fixed real-time factor, for capture-path tests"""
+
+    name = 'null'
+
+    def __init__(self, rtf=0.1, sample_rate=16000):
+        self.rtf = rtf
+        self.sample_rate = sample_rate
+
+    def transcribe(self, audio, **options):
+        time.sleep(len(audio) / self.sample_rate * self.rtf)
+        return {'text': '', 'segments': []}
+
+def percentile(values, q):
+    return float(np.percentile(values, q)) if values else 0.0
+
+class Session:
+    """One recorded clip; ``user`` groups a user's clips for fair queueing"""
+
+    def __init__(self, index, user=0):
+        self.index = index
+        self.user = user
+        self.audio_seconds = 0.0
+        self.dropped_frames = 0
+        self.overruns = 0
+        self.stopped_at = None
+        self.started_decode_at = None
+        self.finished_at = None
+        self.error = None
+
+    @property
+    def queue_delay(self):
+        return self.started_decode_at - self.stopped_at
+
+    @property
+    def latency(self):
+        return self.finished_at - self.stopped_at
+
+def record(session, args):
+    # Same capture path as the apps: callback -> ring -> drain thread
+    ring = RingBuffer(args.sample_rate * 10, channels=1)
+    drain = BufferDrain(ring)
+    stream = SimulatedInputStream(
+        samplerate=args.sample_rate,
+        channels=1,
+        blocksize=args.blocksize,
+        callback=ring.callback,
+        source=parse_source(args.source),
+        speed=args.speed,
+        duration=args.duration
+    )
+    drain.start()
+    stream.start()
+    stream.finished.wait()
+    stream.stop()
+    audio = drain.stop()[:, 0]
+
+    session.audio_seconds = len(audio) / args.sample_rate
+    session.dropped_frames = ring.stats.dropped_frames
+    session.overruns = ring.stats.overruns
+    session.stopped_at = time.perf_counter()
+    return audio
+
+def transcribe(session, backend, audio):
+    session.started_decode_at = time.perf_counter()
+    try:
+        backend.transcribe(audio)
+    except Exception as e:
+        session.error = str(e)
+    session.finished_at = time.perf_counter()
+
+def run_load(args, backend, users=None):
+    # Decodes go through the same fair, bounded queue the Streamlit app uses
+    users = users or args.sessions
+    queue = JobScheduler(workers=args.workers)
+    sessions = []
+    jobs = []
+    lock = threading.Lock()
+
+    def run_user(user):
+        # Each user records clips back to back without waiting for the text
+        for _ in range(args.clips):
+            with lock:
+                session = Session(len(sessions), user)
+                sessions.append(session)
+            audio = record(session, args)
+            job = TranscriptionJob(
+                lambda job, session=session, audio=audio: transcribe(session, backend, audio),
+                session=user
+            )
+            with lock:
+                jobs.append(queue.submit(job))
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=run_user, args=(u,)) for u in range(users)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    for job in jobs:
+        job.wait()
+    queue.shutdown()
+    wall = time.perf_counter() - started
+    return sessions, wall
+
+def report(sessions, wall):
+    audio_total = sum(s.audio_seconds for s in sessions)
+    queue_delays = [s.queue_delay for s in sessions]
+    latencies = [s.latency for s in sessions]
+    errors = [s for s in sessions if s.error]
+
+    print(f"Sessions:          {len(sessions)} ({len(errors)} failed)")
+    print(f"Wall time:         {wall:.2f}s")
+    print(f"Audio processed:   {audio_total:.1f}s")
+    print(f"Throughput:        {audio_total / wall:.2f}x real time, "
+          f"{len(sessions) / wall * 60:.1f} sessions/min")
+    print(f"Queueing delay:    p50 {percentile(queue_delays, 50):.3f}s, "
+          f"p95 {percentile(queue_delays, 95):.3f}s, max {max(queue_delays, default=0):.3f}s")
+    print(f"Stop-to-text:      p50 {percentile(latencies, 50):.3f}s, "
+          f"p95 {percentile(latencies, 95):.3f}s, max {max(latencies, default=0):.3f}s")
+    print(f"Dropped frames:    {sum(s.dropped_frames for s in sessions)}")
+    print(f"Callback overruns: {sum(s.overruns for s in sessions)}")
+    for session in errors:
+        print(f"  session {session.index}: {session.error}")
+
+def sweep(args, backend, user_counts):
+    # One row per concurrency level, e.g. 1, 5 and 20 simultaneous users
+    rows = []
+    for users in user_counts:
+        print(f"\n== {users} users ==")
+        sessions, wall = run_load(args, backend, users)
+        report(sessions, wall)
+        latencies = [s.latency for s in sessions]
+        rows.append((users, len(sessions), percentile(latencies, 50), percentile(latencies, 95),
+                     max(latencies, default=0.0), sum(s.audio_seconds for s in sessions) / wall))
+    print(f"\n{'Users':>5}  {'Clips':>5}  {'p50':>8}  {'p95':>8}  {'max':>8}  {'xRT':>6}")
+    for users, clips, p50, p95, worst, throughput in rows:
+        print(f"{users:5d}  {clips:5d}  {p50:7.2f}s  {p95:7.2f}s  {worst:7.2f}s  {throughput:6.2f}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Run concurrent record -> transcribe sessions against a simulated microphone")
+    parser.add_argument('--sessions', type=int, default=8, help="Concurrent users")
+    parser.add_argument('--users', default=None,
+                        help="Comma-separated user counts to sweep, e.g. 1,5,20 (overrides --sessions)")
+    parser.add_argument('--clips', type=int, default=1, help="Clips each user records and queues")
+    parser.add_argument('--workers', type=int, default=2, help="Concurrent transcriptions")
+    parser.add_argument('--duration', type=float, default=5.0, help="Seconds of audio per session")
+    parser.add_argument('--speed', type=float, default=1.0, help="Playback speed (0 = as fast as possible)")
+    parser.add_argument('--source', default='sine', help="sine[:Hz], noise, silence or a WAV fixture")
+    parser.add_argument('--sample-rate', type=int, default=16000)
+    parser.add_argument('--blocksize', type=int, default=512)
+    parser.add_argument('--backend', default='null', choices=['null', 'whisper', 'whisper-int8', 'mlx'])
+    parser.add_argument('--model', default=None)
+    parser.add_argument('--null-rtf', type=float, default=0.1, help="Real-time factor of the null backend")
+    args = parser.parse_args()
+
+    if args.backend == 'null':
+        backend = NullBackend(args.null_rtf, args.sample_rate)
+    else:
+        from backends import create_backend
+        backend = create_backend(args.backend, args.model)
+        if args.sample_rate != 16000:
+            parser.error("Whisper backends need --sample-rate 16000")
+
+    if args.users:
+        sweep(args, backend, [int(n) for n in args.users.split(',')])
+    else:
+        sessions, wall = run_load(args, backend)
+        report(sessions, wall)
+
+if __name__ == "__main__":
+    main()
@@ -1,46 +1,61 @@
 from PIL import Image, ImageDraw, ImageFont
 import os
+import shutil
+import subprocess
+from create_icon import (ICON_SIZES, build_fingerprint, build_pyramid, file_sha256,
+                         iconset_entries, is_up_to_date, write_images, write_stamp)
 
-def create_icon(size, emoji, output_path):
+EMOJI_FONT = '/System/Library/Fonts/Apple Color Emoji.ttc'
+
+def create_icon(size, emoji):
     # Create a new image with a transparent background
     image = Image.new('RGBA', (size, size), (0, 0, 0, 0))
     draw = ImageDraw.Draw(image)
-    
+
     # Load a font that supports emoji (Apple Color Emoji for macOS)
     font_size = int(size * 0.8)  # Make emoji slightly smaller than the canvas
     try:
-        font = ImageFont.truetype('/System/Library/Fonts/Apple Color Emoji.ttc', font_size)
+        font = ImageFont.truetype(EMOJI_FONT, font_size)
     except:
         font = ImageFont.load_default()
-    
+
     # Calculate text position to center the emoji
     left, top, right, bottom = font.getbbox(emoji)
     w = right - left
     h = bottom - top
     x = (size - w) / 2
     y = (size - h) / 2
-    
+
     # Draw the emoji
     draw.text((x, y), emoji, font=font, embedded_color=True)
-    
-    # Save the image
-    image.save(output_path)
-
-# Create icons directory
-if not os.path.exists('icons'):
-    os.makedirs('icons')
-
-# Create icons of different sizes
-sizes = [16, 32, 64, 128, 256, 512, 1024]
-for size in sizes:
-    create_icon(size, "🎙️", f"icons/icon_{size}x{size}.png")
-
-# Create icns file using iconutil
-os.system("mkdir -p icons.iconset")
-for size in sizes:
-    os.system(f"cp icons/icon_{size}x{size}.png icons.iconset/icon_{size}x{size}.png")
-    if size <= 512:  # Create @2x versions for retina displays
-        os.system(f"cp icons/icon_{size*2}x{size*2}.png icons.iconset/icon_{size}x{size}@2x.png")
-
-os.system("iconutil -c icns icons.iconset -o icons/AppIcon.icns")
-os.system("rm -rf icons.iconset")  # Clean up
+    return image
+
+def make_icons(emoji, out_dir='icons', force=False):
+    icns_path = os.path.join(out_dir, 'AppIcon.icns')
+    stamp_path = os.path.join(out_dir, '.AppIcon.icns.stamp')
+    font_hash = file_sha256(EMOJI_FONT) if os.path.exists(EMOJI_FONT) else None
+    fingerprint = build_fingerprint(font_hash, emoji=emoji, sizes=ICON_SIZES)
+
+    if not force and is_up_to_date(stamp_path, icns_path, fingerprint):
+        return False
+
+    # Render the emoji once at full size and downsample the rest
+    pyramid = build_pyramid(create_icon(max(ICON_SIZES), emoji), ICON_SIZES)
+
+    # Write the plain PNGs and the iconset straight from memory
+    write_images(pyramid, [(f'icon_{s}x{s}.png', s) for s in ICON_SIZES], out_dir)
+    # The emoji iconset has always included icon_512x512@2x
+    write_images(pyramid, iconset_entries(ICON_SIZES, largest_2x=512), 'icons.iconset')
+
+    # Create icns file using iconutil
+    try:
+        subprocess.run(['iconutil', '-c', 'icns', 'icons.iconset', '-o', icns_path], check=True)
+    finally:
+        shutil.rmtree('icons.iconset', ignore_errors=True)  # Clean up
+
+    write_stamp(stamp_path, fingerprint)
+    return True
+
+if __name__ == '__main__':
+    if not make_icons("🎙️"):
+        print("Icons are up to date, skipping generation")
@@ -0,0 +1,202 @@
+import os
+import gc
+import sys
+import tempfile
+import threading
+from collections import OrderedDict
+import numpy as np
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+MB = 1024 * 1024
+
+def current_rss():
+    """Resident set size of this process in bytes, or None if unknown"""
+    if psutil is not None:
+        return psutil.Process().memory_info().rss
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError):
+        pass
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # ru_maxrss is bytes on macOS and kilobytes on Linux
+        return peak if sys.platform == 'darwin' else peak * 1024
+    except ImportError:
+        return None
+
+def total_memory():
+    if psutil is not None:
+        return psutil.virtual_memory().total
+    try:
+        return os.sysconf('SC_PAGE_SIZE') * os.sysconf('SC_PHYS_PAGES')
+    except (ValueError, OSError, AttributeError):
+        return None
+
+def default_budget():
+    # TRANSCRIBER_MEMORY_BUDGET_MB wins; otherwise allow 60% of physical RAM
+    configured = os.environ.get('TRANSCRIBER_MEMORY_BUDGET_MB')
+    if configured:
+        return int(configured) * MB
+    total = total_memory()
+    return int(total * 0.6) if total else 4096 * MB
+
+def model_footprint(model):
+    # Exact for torch modules, otherwise the caller falls back to RSS deltas
+    parameters = getattr(model, 'parameters', None)
+    if callable(parameters):
+        try:
+            total = sum(p.numel() * p.element_size() for p in parameters())
+            # Dynamically quantized layers keep their int8 weights outside parameters()
+            for module in model.modules():
+                if hasattr(module, '_packed_params') and callable(getattr(module, 'weight', None)):
+                    weight = module.weight()
+                    total += weight.numel() * weight.element_size()
+            return total
+        except (AttributeError, TypeError):
+            pass
+    return None
+
+class MemoryGovernor:
+    """Keeps resident models and capture buffers within a memory budget.
+
+    Models are held in an LRU cache and evicted oldest-first when loading
+    another one would exceed the budget. Buffers register their size and
+    spill to disk when the process gets close to the budget.
+    """
+
+    def __init__(self, budget=None, spill_threshold=0.9):
+        self.budget = budget or default_budget()
+        self.spill_threshold = spill_threshold
+        self.models = OrderedDict()   # name -> (model, footprint bytes)
+        self.buffers = {}             # id -> (description, bytes in memory)
+        self._lock = threading.RLock()
+
+    def tracked_bytes(self):
+        with self._lock:
+            return (sum(size for _, size in self.models.values())
+                    + sum(size for _, size in self.buffers.values()))
+
+    def used_bytes(self):
+        # Prefer the real RSS, fall back to what we track ourselves
+        rss = current_rss()
+        return rss if rss is not None else self.tracked_bytes()
+
+    def near_budget(self, extra=0):
+        return self.used_bytes() + extra >= self.budget * self.spill_threshold
+
+    def get_model(self, name, loader):
+        """Return a cached model, loading it with ``loader(name)`` if needed"""
+        with self._lock:
+            if name in self.models:
+                self.models.move_to_end(name)
+                return self.models[name][0]
+
+            # Make room using the footprint of models we have seen before
+            estimate = max((size for _, size in self.models.values()), default=0)
+            while self.models and self.near_budget(estimate):
+                used = self.used_bytes()
+                self.evict_lru()
+                if self.used_bytes() >= used:
+                    # Nothing was freed (the model is still referenced, or the
+                    # allocator keeps the pages); evicting more only loses cache
+                    break
+
+            before = current_rss()
+            model = loader(name)
+            footprint = model_footprint(model)
+            if footprint is None:
+                after = current_rss()
+                footprint = max(after - before, 0) if before is not None and after is not None else 0
+
+            self.models[name] = (model, footprint)
+            return model
+
+    def evict_lru(self):
+        with self._lock:
+            if not self.models:
+                return None
+            name, _ = self.models.popitem(last=False)
+        gc.collect()
+        return name
+
+    def clear_models(self):
+        with self._lock:
+            self.models.clear()
+        gc.collect()
+
+    def track_buffer(self, key, description, size):
+        with self._lock:
+            self.buffers[key] = (description, size)
+
+    def release_buffer(self, key):
+        with self._lock:
+            self.buffers.pop(key, None)
+
+    def status_text(self):
+        used = self.used_bytes()
+        with self._lock:
+            models = len(self.models)
+        return (f"Memory: {used / MB:.0f} / {self.budget / MB:.0f} MB "
+                f"({models} model{'s' if models != 1 else ''} loaded)")
+
+class SpillableBuffer:
+    """Append-only audio buffer that moves its contents to disk under pressure"""
+
+    def __init__(self, governor, channels=1, dtype=np.float32, description="capture"):
+        self.governor = governor
+        self.channels = channels
+        self.dtype = np.dtype(dtype)
+        self.description = description
+        self.chunks = []
+        self.memory_bytes = 0
+        self.spill_path = None
+        self.spilled_frames = 0
+
+    def append(self, chunk):
+        chunk = np.asarray(chunk, dtype=self.dtype).reshape(-1, self.channels)
+        self.chunks.append(chunk)
+        self.memory_bytes += chunk.nbytes
+        self.governor.track_buffer(id(self), self.description, self.memory_bytes)
+        if self.governor.near_budget():
+            self.spill()
+
+    def spill(self):
+        if not self.chunks:
+            return
+        if self.spill_path is None:
+            fd, self.spill_path = tempfile.mkstemp(suffix='.f32', prefix='transcriber_spill_')
+            os.close(fd)
+        with open(self.spill_path, 'ab') as f:
+            for chunk in self.chunks:
+                chunk.tofile(f)
+                self.spilled_frames += len(chunk)
+        self.chunks = []
+        self.memory_bytes = 0
+        self.governor.track_buffer(id(self), self.description, 0)
+
+    def __len__(self):
+        return self.spilled_frames + sum(len(chunk) for chunk in self.chunks)
+
+    def to_array(self):
+        parts = []
+        if self.spill_path is not None:
+            parts.append(np.fromfile(self.spill_path, dtype=self.dtype).reshape(-1, self.channels))
+        parts.extend(self.chunks)
+        if not parts:
+            return np.empty((0, self.channels), dtype=self.dtype)
+        return np.concatenate(parts, axis=0)
+
+    def close(self):
+        self.chunks = []
+        self.memory_bytes = 0
+        self.governor.release_buffer(id(self))
+        if self.spill_path is not None:
+            os.unlink(self.spill_path)
+            self.spill_path = None
+            self.spilled_frames = 0
@@ -1,15 +1,19 @@
 import rumps
-import sounddevice as sd
-import numpy as np
-import wavio
-import tempfile
-import os
+import input_devices
 import time
-import mlx_whisper
 import threading
 import queue
 import pyperclip
 from datetime import datetime
+from audio_buffer import RingBuffer, BufferDrain
+from multichannel import MultiDeviceCapture, transcribe_channels, format_transcript
+from memory_budget import current_rss, MB
+from preroll import WarmInput, PREROLL_SECONDS
+from features import FeatureStream, audio_log_mel, transcribe_mlx_features, SAMPLE_RATE
+from profiling import profile_job, profiling_enabled, set_profiling
+from autotune import tuned_settings
+from progress import watch_progress
+from scheduler import JobScheduler, TranscriptionJob, priority_for, DONE, CANCELLED, RUNNING
 
 class TranscriptionWindow(rumps.Window):
     def __init__(self, title, message, dimensions=(500, 300)):
@@ -42,15 +46,33 @@ class AudioTranscriptionApp(rumps.App):
         # Initialize Whisper model
         # Using a valid model from Hugging Face
         self.model_path = "mlx-community/whisper-medium-mlx"  # Hugging Face medium model
+        self.n_mels = 80  # Mel bins expected by the medium model
+        # Decode options measured by `python autotune.py --backend mlx`
+        self.tuned = tuned_settings('mlx', self.model_path)
         
         # Recording state
         self.recording = False
-        self.audio_data = []
-        self.audio_queue = queue.Queue()
         self.sample_rate = 44100
+        # Ring holds a few seconds; the drain thread empties it continuously
+        self.ring = RingBuffer(self.sample_rate * 10, channels=1)
+        self.drain = None
+        self.features = None
+        self.multi_capture = None
+        self.stream = None
+        # Optional always-open input that keeps the last few seconds warm
+        self.preroll_seconds = PREROLL_SECONDS
+        self.warm_input = None
         self.start_time = None
         self.transcription_history = []
         
+        # Transcriptions run as cancellable jobs; short dictations preempt
+        # long recordings. Finished jobs are handed back to the main thread.
+        self.scheduler = JobScheduler()
+        self.jobs = []
+        self.finished_jobs = queue.Queue()
+        self.job_timer = rumps.Timer(self.poll_jobs, 0.5)
+        self.job_timer.start()
+        
         # Menu items
         self.start_button = rumps.MenuItem(
             title="Start Recording",
@@ -68,6 +90,26 @@ class AudioTranscriptionApp(rumps.App):
         self.status_item = rumps.MenuItem(title="Ready to record")
         self.status_item.set_callback(None)
         
+        self.capture_item = rumps.MenuItem(title="Capture: no data yet")
+        self.capture_item.set_callback(None)
+        
+        self.memory_item = rumps.MenuItem(title="Memory: -")
+        self.memory_item.set_callback(None)
+        
+        self.queue_item = rumps.MenuItem(title="No transcriptions queued")
+        self.queue_item.set_callback(None)
+        
+        # Tail of the transcript as segments are decoded
+        self.live_item = rumps.MenuItem(title="Live: -")
+        self.live_item.set_callback(None)
+        self.live_segments = 0
+        
+        self.cancel_button = rumps.MenuItem(
+            title="Cancel Transcription",
+            callback=self.cancel_transcriptions
+        )
+        self.cancel_button.set_callback(None)  # Nothing to cancel yet
+        
         # History submenu
         self.history_menu = rumps.MenuItem("Recent Transcriptions")
         no_history = rumps.MenuItem("No recent transcriptions")
@@ -80,14 +122,31 @@ class AudioTranscriptionApp(rumps.App):
                                       callback=self.toggle_auto_copy)
         self.auto_copy.state = True  # Enable by default
         self.settings_menu.add(self.auto_copy)
+        self.multi_channel = rumps.MenuItem("One speaker per input channel",
+                                          callback=self.toggle_multi_channel)
+        self.multi_channel.state = False
+        self.settings_menu.add(self.multi_channel)
+        self.always_listen = rumps.MenuItem("Always listening (instant start)",
+                                          callback=self.toggle_always_listen)
+        self.always_listen.state = False
+        self.settings_menu.add(self.always_listen)
+        self.profile_jobs = rumps.MenuItem("Profile transcriptions",
+                                         callback=self.toggle_profiling)
+        self.profile_jobs.state = profiling_enabled()
+        self.settings_menu.add(self.profile_jobs)
         
         # Add menu items
         self.menu = [
             self.start_button,
             self.stop_button,
+            self.cancel_button,
             None,  # Separator
             self.status_item,
             self.timer_item,
+            self.capture_item,
+            self.memory_item,
+            self.queue_item,
+            self.live_item,
             None,  # Separator
             self.history_menu,
             None,  # Separator
@@ -135,22 +194,56 @@ class AudioTranscriptionApp(rumps.App):
     def toggle_auto_copy(self, sender):
         sender.state = not sender.state
     
-    def audio_callback(self, indata, frames, time_info, status):
-        if status:
-            print(status)
-        self.audio_queue.put(indata.copy())
+    def toggle_multi_channel(self, sender):
+        sender.state = not sender.state
+    
+    def toggle_profiling(self, sender):
+        sender.state = not sender.state
+        set_profiling(bool(sender.state))
+    
+    def toggle_always_listen(self, sender):
+        sender.state = not sender.state
+        if self.recording:
+            # The current recording keeps its own stream; reset_ui applies
+            # the change once it has stopped
+            return
+        if sender.state:
+            self.open_warm_input()
+        elif self.warm_input is not None:
+            self.warm_input.close()
+            self.warm_input = None
+            self.status_item.title = "Ready to record"
+    
+    def open_warm_input(self):
+        self.warm_input = WarmInput(self.sample_rate, self.preroll_seconds)
+        self.warm_input.open()
+        self.status_item.title = self.warm_input.status_text()
+    
+    def update_capture_stats(self):
+        stats = self.ring.stats
+        self.capture_item.title = (
+            f"Capture: {stats.overruns} overruns, {stats.dropped_frames} dropped"
+        )
+    
+    def update_memory_status(self):
+        rss = current_rss()
+        if rss is not None:
+            self.memory_item.title = f"Memory: {rss / MB:.0f} MB"
     
     def update_timer(self):
         while self.recording:
             elapsed = time.time() - self.start_time
             mins, secs = divmod(int(elapsed), 60)
             self.timer_item.title = f"⏱️ {mins:02d}:{secs:02d}"
+            self.update_capture_stats()
+            self.update_memory_status()
             time.sleep(0.1)
     
     def start_recording(self, _):
         self.recording = True
-        self.audio_data = []
         self.start_time = time.time()
+        self.ring.clear()
+        self.ring.stats.reset()
         
         # Update UI
         self.start_button.set_callback(None)  # Disable start button
@@ -159,17 +252,44 @@ class AudioTranscriptionApp(rumps.App):
         self.status_item.title = "Recording in progress..."
         self.start_button.title = "Recording..."
         
-        # Start audio stream
-        self.stream = sd.InputStream(
-            channels=1,
-            samplerate=self.sample_rate,
-            callback=self.audio_callback
-        )
-        self.stream.start()
+        if self.multi_channel.state:
+            # Record every channel of the input device in lockstep
+            channels = input_devices.query_input_channels()
+            self.multi_capture = MultiDeviceCapture(
+                channels_per_device=channels,
+                sample_rate=self.sample_rate
+            )
+            self.multi_capture.start()
+        elif self.warm_input is not None:
+            # Stream is already running: redirect it and keep the pre-roll
+            self.start_feature_stream()
+            preroll = self.warm_input.begin_capture(self.ring)
+            self.drain.chunks.append(preroll)
+            self.features.feed(preroll[:, 0])
+            self.drain.start()
+        else:
+            # Start audio stream
+            self.stream = input_devices.InputStream(
+                channels=1,
+                samplerate=self.sample_rate,
+                dtype='float32',
+                callback=self.ring.callback
+            )
+            self.start_feature_stream()
+            self.drain.start()
+            self.stream.start()
         
         # Start timer update thread
         threading.Thread(target=self.update_timer, daemon=True).start()
     
+    def start_feature_stream(self):
+        # Log-mel frames are computed while recording, off the callback thread
+        self.features = FeatureStream(self.sample_rate, n_mels=self.n_mels)
+        self.drain = BufferDrain(
+            self.ring,
+            on_chunk=lambda chunk: self.features.feed(chunk[:, 0])
+        )
+    
     def stop_recording(self, _):
         if not self.recording:
             return
@@ -177,49 +297,153 @@ class AudioTranscriptionApp(rumps.App):
         self.recording = False
         self.status_item.title = "Processing audio..."
         
-        # Stop the stream
-        self.stream.stop()
-        self.stream.close()
+        if self.multi_capture is not None:
+            self.stop_multi_channel_recording()
+            return
         
-        # Process all remaining audio in queue
-        while not self.audio_queue.empty():
-            self.audio_data.extend(self.audio_queue.get()[:, 0])
+        if self.stream is not None:
+            # Stop the stream
+            self.stream.stop()
+            self.stream.close()
+            self.stream = None
+        else:
+            # Leave the warm stream open and send it back to the pre-roll
+            self.warm_input.end_capture()
+        
+        # Collect everything captured, including what is still in the ring
+        recording = self.drain.stop()[:, 0]
+        self.update_capture_stats()
+        print(f"Capture stats: {self.ring.stats.summary()}")
         
-        # Convert to numpy array
-        recording = np.array(self.audio_data)
+        # Only the last few blocks still need resampling and framing
+        audio, mel = self.features.finish()
+        self.features = None
         
         if len(recording) > 0:
-            # Save the recording to a temporary WAV file
-            with tempfile.NamedTemporaryFile(delete=False, suffix='.wav') as temp_audio:
-                wavio.write(temp_audio.name, recording, self.sample_rate, sampwidth=2)
-                
-                # Update UI to show transcribing status
-                self.title = "⏳"
-                self.status_item.title = "Transcribing..."
-                
-                # Transcribe the audio
-                result = mlx_whisper.transcribe(temp_audio.name, path_or_hf_repo=self.model_path)
-                self.transcribed_text = result['text']
-                
-                # Add to history
-                self.transcription_history.append((datetime.now(), self.transcribed_text))
-                self.update_history_menu()
-                
-                # Auto-copy if enabled
-                if self.auto_copy.state:
-                    pyperclip.copy(self.transcribed_text)
-                    self.status_item.title = "Transcription copied to clipboard!"
-                
-                # Show transcription window
-                self.show_transcription_window(self.transcribed_text)
-                
-                # Clean up
-                os.unlink(temp_audio.name)
+            # Decode from the features computed during capture, off the main thread
+            def transcribe(job):
+                with profile_job("stop_recording"):
+                    return transcribe_mlx_features(audio, mel, path_or_hf_repo=self.model_path, **self.tuned)['text']
+            self.submit_transcription(transcribe, len(audio) / SAMPLE_RATE)
+        
+        self.reset_ui()
+    
+    def submit_transcription(self, fn, audio_seconds):
+        job = TranscriptionJob(
+            fn,
+            priority=priority_for(audio_seconds),
+            name=f"{audio_seconds:.0f}s recording",
+            audio_seconds=audio_seconds,
+            callback=self.finished_jobs.put,
+            model=('mlx', self.model_path)
+        )
+        self.jobs.append(job)
+        self.scheduler.submit(job)
+        self.update_queue_status()
+    
+    def cancel_transcriptions(self, _):
+        for job in self.jobs:
+            job.cancel()
+        self.queue_item.title = "Cancelling..."
+    
+    def update_queue_status(self):
+        waiting = [job for job in self.jobs if not job.finished]
+        text = self.scheduler.status_text()
+        positions = [self.scheduler.position(job) for job in waiting]
+        queued = [str(p) for p in positions if p]
+        if queued:
+            text += f" (yours: #{', #'.join(queued)})"
+        self.queue_item.title = text
+        self.cancel_button.set_callback(self.cancel_transcriptions if waiting else None)
+        
+        running = next((job for job in waiting if job.state == RUNNING), None)
+        if running is not None and len(running.segments) != self.live_segments:
+            # Only the tail is shown, so long transcripts never get re-rendered
+            self.live_segments = len(running.segments)
+            tail = "".join(segment['text'] for segment in running.segments[-3:]).strip()
+            self.live_item.title = "Live: …" + tail[-60:] if len(tail) > 60 else f"Live: {tail}"
+        elif running is None and self.live_segments:
+            self.live_segments = 0
+            self.live_item.title = "Live: -"
+        
+        if not self.recording:
+            if running is not None and running.progress:
+                self.title = f"⏳ {running.progress * 100:.0f}%"
+            else:
+                self.title = "⏳" if waiting else "🎙️"
+    
+    def poll_jobs(self, _):
+        # rumps.Timer runs on the main thread, so UI work is safe here
+        while True:
+            try:
+                job = self.finished_jobs.get_nowait()
+            except queue.Empty:
+                break
+            if job in self.jobs:
+                self.jobs.remove(job)
+            if job.state == DONE:
+                self.transcription_finished(job.result)
+            elif job.state == CANCELLED:
+                self.status_item.title = "Transcription cancelled"
+            else:
+                print(f"Transcription failed: {job.error}")
+                self.status_item.title = f"Transcription failed: {job.error}"
+        self.update_queue_status()
+    
+    def transcription_finished(self, text):
+        self.transcribed_text = text
         
+        # Add to history
+        self.transcription_history.append((datetime.now(), self.transcribed_text))
+        self.update_history_menu()
+        
+        # Auto-copy if enabled
+        if self.auto_copy.state:
+            pyperclip.copy(self.transcribed_text)
+            self.status_item.title = "Transcription copied to clipboard!"
+        
+        # Show transcription window
+        self.show_transcription_window(self.transcribed_text)
+    
+    def stop_multi_channel_recording(self):
+        recording = self.multi_capture.stop()
+        print(f"Capture: {self.multi_capture.channels} channels, "
+              f"{self.multi_capture.overruns} overruns, "
+              f"{self.multi_capture.dropped_frames} dropped frames")
+        self.multi_capture = None
+        
+        if len(recording) > 0:
+            def transcribe(job):
+                def front_end(samples):
+                    return audio_log_mel(samples, self.sample_rate, self.n_mels)
+
+                def transcribe_channel(mel):
+                    # Only checks for cancellation between windows
+                    with watch_progress(lambda done, total: job.checkpoint()):
+                        return transcribe_mlx_features(None, mel, path_or_hf_repo=self.model_path, **self.tuned)
+                # Front ends run concurrently, decodes one channel at a time, then merged by time
+                segments = transcribe_channels(recording, transcribe_channel, front_end=front_end)
+                return format_transcript(segments)
+            self.submit_transcription(transcribe, len(recording) / self.sample_rate)
+        
+        self.reset_ui()
+    
+    def reset_ui(self):
         # Reset UI
-        self.title = "🎙️"
+        self.update_memory_status()
+        self.update_queue_status()
         self.timer_item.title = "00:00"
-        self.status_item.title = "Ready to record"
+        if self.warm_input is not None and not self.always_listen.state:
+            # Always-listening was switched off mid-recording
+            self.warm_input.close()
+            self.warm_input = None
+        elif self.warm_input is None and self.always_listen.state:
+            # ...or switched on mid-recording
+            self.open_warm_input()
+        if self.warm_input is not None:
+            self.status_item.title = self.warm_input.status_text()
+        else:
+            self.status_item.title = "Ready to record"
         self.start_button.title = "Start Recording"
         self.start_button.set_callback(self.start_recording)  # Enable start button
         self.stop_button.set_callback(None)  # Disable stop button
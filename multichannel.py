@@ -0,0 +1,148 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import input_devices
+from audio_buffer import RingBuffer
+
+class MultiDeviceCapture:
+    """Record several channels and/or devices in lockstep.
+
+    Every device gets its own ring buffer fed by its PortAudio callback; a
+    drain thread pulls the same number of frames from each ring and
+    interleaves them into one (frames, channels) buffer, so channel ``i``
+    of the result always lines up in time with every other channel.
+    A single multi-channel interface is just ``devices=[device]`` with
+    ``channels_per_device=N``.
+    """
+
+    def __init__(self, devices=(None,), channels_per_device=1, sample_rate=44100,
+                 ring_seconds=10, interval=0.05):
+        self.devices = list(devices)
+        self.channels_per_device = channels_per_device
+        self.sample_rate = sample_rate
+        self.interval = interval
+        self.rings = [
+            RingBuffer(sample_rate * ring_seconds, channels=channels_per_device)
+            for _ in self.devices
+        ]
+        self.streams = []
+        self.chunks = []
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    @property
+    def channels(self):
+        return len(self.devices) * self.channels_per_device
+
+    @property
+    def dropped_frames(self):
+        return sum(ring.stats.dropped_frames for ring in self.rings)
+
+    @property
+    def overruns(self):
+        return sum(ring.stats.overruns for ring in self.rings)
+
+    def start(self):
+        self.chunks = []
+        self._stop_event.clear()
+        for device, ring in zip(self.devices, self.rings):
+            ring.stats.reset()
+            self.streams.append(input_devices.InputStream(
+                device=device,
+                channels=self.channels_per_device,
+                samplerate=self.sample_rate,
+                dtype='float32',
+                callback=ring.callback
+            ))
+        for stream in self.streams:
+            stream.start()
+
+        # Streams start one after another; discard whatever arrived before
+        # the last one was running so all rings begin at the same instant
+        for ring in self.rings:
+            ring.clear()
+
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while not self._stop_event.wait(self.interval):
+            self._drain()
+
+    def _drain(self):
+        n = min(ring.available() for ring in self.rings)
+        if n:
+            self.chunks.append(np.hstack([ring.read(n) for ring in self.rings]))
+
+    def stop(self):
+        # Stop all devices and return the interleaved recording
+        for stream in self.streams:
+            stream.stop()
+            stream.close()
+        self.streams = []
+
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self._drain()
+
+        if not self.chunks:
+            return np.empty((0, self.channels), dtype=np.float32)
+        return np.concatenate(self.chunks, axis=0)
+
+def channel_labels(count):
+    return [f"Speaker {i + 1}" for i in range(count)]
+
+def transcribe_channels(audio, transcribe_fn, labels=None, max_workers=None,
+                        silence_rms=1e-4, front_end=None):
+    """Transcribe each column of ``audio``.
+
+    ``front_end``, if given, turns a mono float32 channel into whatever
+    ``transcribe_fn`` takes (e.g. its log-mel spectrogram) and runs for all
+    channels concurrently. The decodes themselves run one at a time, in
+    channel order, as soon as each channel's front end is done: the
+    backends share one model, and openai-whisper keeps its KV cache in
+    hooks on that model, so concurrent decodes would corrupt each other.
+
+    ``transcribe_fn`` returns a Whisper-style result dict with
+    ``segments``. Returns one time-ordered list of segments, each tagged
+    with the speaker label of the channel it came from.
+    """
+    if audio.ndim == 1:
+        audio = audio[:, np.newaxis]
+    labels = labels or channel_labels(audio.shape[1])
+
+    # Whisper tends to hallucinate on silence, so skip dead channels
+    active = [
+        i for i in range(audio.shape[1])
+        if np.sqrt(np.mean(np.square(audio[:, i], dtype=np.float64))) >= silence_rms
+    ]
+
+    def prepare(index):
+        mono = np.ascontiguousarray(audio[:, index], dtype=np.float32)
+        return index, front_end(mono) if front_end is not None else mono
+
+    segments = []
+    with ThreadPoolExecutor(max_workers=max_workers or len(active) or 1) as pool:
+        for index, prepared in pool.map(prepare, active):
+            result = transcribe_fn(prepared)
+            for segment in result.get('segments', []):
+                text = segment['text'].strip()
+                if text:
+                    segments.append({
+                        'speaker': labels[index],
+                        'start': segment['start'],
+                        'end': segment['end'],
+                        'text': text,
+                    })
+
+    segments.sort(key=lambda s: (s['start'], s['end']))
+    return segments
+
+def format_transcript(segments):
+    lines = []
+    for segment in segments:
+        mins, secs = divmod(segment['start'], 60)
+        lines.append(f"[{int(mins):02d}:{secs:04.1f}] {segment['speaker']}: {segment['text']}")
+    return "\n".join(lines)
@@ -0,0 +1,157 @@
+import os
+import time
+import threading
+import numpy as np
+import input_devices
+
+# Audio kept from before recording starts:
+#   TRANSCRIBER_PREROLL_SECONDS=2.0
+PREROLL_SECONDS = float(os.environ.get('TRANSCRIBER_PREROLL_SECONDS', '2.0'))
+
+class PrerollRing:
+    """Fixed-size ring that always holds the most recent input.
+
+    Unlike RingBuffer it never drops new audio: the oldest frames are
+    overwritten. It is written only from the audio callback while idle
+    and read once when capture begins, after writes have been redirected.
+    """
+
+    def __init__(self, frames, channels=1, dtype=np.float32):
+        self.capacity = int(frames)
+        self.channels = channels
+        self._data = np.zeros((self.capacity, channels), dtype=dtype)
+        self._write_pos = 0
+
+    def write(self, block):
+        n = len(block)
+        if n >= self.capacity:
+            block = block[-self.capacity:]
+            n = self.capacity
+        start = self._write_pos % self.capacity
+        first = min(n, self.capacity - start)
+        self._data[start:start + first] = block[:first]
+        if first < n:
+            self._data[:n - first] = block[first:n]
+        self._write_pos += n
+
+    def latest(self, frames):
+        # Copy of the last ``frames`` frames in chronological order
+        n = min(int(frames), self.capacity, self._write_pos)
+        end = self._write_pos % self.capacity
+        if n <= end:
+            return self._data[end - n:end].copy()
+        return np.concatenate((self._data[self.capacity - (n - end):], self._data[:end]))
+
+    def reset(self):
+        self._write_pos = 0
+
+class WarmInput:
+    """Input stream kept open between recordings for zero-latency starts.
+
+    While idle the callback only copies into a small PrerollRing, using a
+    large block size so the device wakes us up as rarely as possible.
+    ``begin_capture`` redirects the callback to a capture RingBuffer and
+    returns the pre-roll audio that immediately precedes it.
+    """
+
+    def __init__(self, sample_rate, preroll_seconds=PREROLL_SECONDS, channels=1, blocksize=2048, device=None):
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self.preroll_seconds = preroll_seconds
+        self.blocksize = blocksize
+        self.device = device
+        # One second of slack so a snapshot never races the writer
+        self.preroll = PrerollRing(sample_rate * (preroll_seconds + 1), channels=channels)
+        self.stream = None
+        self._target = None
+        # Hand-off to a capture ring, done by the callback between blocks
+        self._pending = None
+        self._handoff = None
+        self._switched = threading.Event()
+        self.idle_callback_time = 0.0
+        self._idle_since = None
+        self._idle_wall = 0.0
+
+    @property
+    def active(self):
+        return self.stream is not None
+
+    def open(self):
+        if self.stream is not None:
+            return
+        self.preroll.reset()
+        self.stream = input_devices.InputStream(
+            device=self.device,
+            channels=self.channels,
+            samplerate=self.sample_rate,
+            blocksize=self.blocksize,
+            latency='high',
+            dtype='float32',
+            callback=self._callback
+        )
+        self.stream.start()
+        self._idle_since = time.perf_counter()
+
+    def close(self):
+        if self.stream is None:
+            return
+        self.stream.stop()
+        self.stream.close()
+        self.stream = None
+        self._pending = None
+        self._target = None
+        self._mark_busy()
+
+    def _callback(self, indata, frames, time_info, status):
+        target = self._target
+        if target is None and self._pending is not None:
+            self._switch()
+            target = self._target
+        if target is not None:
+            target.callback(indata, frames, time_info, status)
+            return
+        started = time.perf_counter()
+        self.preroll.write(indata)
+        self.idle_callback_time += time.perf_counter() - started
+
+    def _mark_busy(self):
+        if self._idle_since is not None:
+            self._idle_wall += time.perf_counter() - self._idle_since
+            self._idle_since = None
+
+    def _switch(self):
+        # Between two blocks: every earlier block is in the pre-roll and
+        # every later one goes to the ring, so the two join seamlessly
+        self._handoff = self.preroll.latest(self.sample_rate * self.preroll_seconds)
+        self._target = self._pending
+        self._pending = None
+        self._switched.set()
+
+    def begin_capture(self, ring):
+        """Send input to ``ring`` from the next block on; returns the pre-roll before it"""
+        self._mark_busy()
+        self._switched.clear()
+        self._pending = ring
+        # A few blocks' worth; a stalled device must not hang the caller
+        if not self._switched.wait(max(4 * self.blocksize / self.sample_rate, 0.5)):
+            # Nothing is being delivered, so nothing can be lost either
+            self._switch()
+        handoff, self._handoff = self._handoff, None
+        return handoff
+
+    def end_capture(self):
+        self._pending = None
+        self._target = None
+        self.preroll.reset()
+        self._idle_since = time.perf_counter()
+
+    @property
+    def idle_load(self):
+        """Fraction of idle wall time spent inside the audio callback"""
+        wall = self._idle_wall
+        if self._idle_since is not None:
+            wall += time.perf_counter() - self._idle_since
+        return self.idle_callback_time / wall if wall else 0.0
+
+    def status_text(self):
+        return f"Listening (pre-roll {self.preroll_seconds:.1f}s, idle CPU {self.idle_load * 100:.2f}%)"
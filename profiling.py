@@ -0,0 +1,265 @@
+#!/usr/bin/env python3
+import os
+import sys
+import json
+import time
+import argparse
+import threading
+import tracemalloc
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime
+from memory_budget import current_rss, MB
+
+# Opt in with TRANSCRIBER_PROFILE=1 or set_profiling(True)
+_enabled = os.environ.get('TRANSCRIBER_PROFILE', '') not in ('', '0')
+PROFILE_DIR = os.environ.get(
+    'TRANSCRIBER_PROFILE_DIR',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "profiles")
+)
+
+def set_profiling(enabled):
+    global _enabled
+    _enabled = enabled
+
+def profiling_enabled():
+    return _enabled
+
+# Stacks parked in these modules are waiting, not working
+IDLE_MODULES = ('threading.py', 'queue.py', 'selectors.py', 'connection.py')
+
+class SamplingProfiler(threading.Thread):
+    """Samples thread stacks at a fixed interval.
+
+    Much cheaper than cProfile on decode loops: the profiled threads run
+    untouched and we only count which functions are on their stacks.
+    With ``thread_id=None`` every busy thread is sampled, which covers
+    the background feature and drain threads a job relies on.
+    """
+
+    def __init__(self, thread_id=None, interval=0.005):
+        super().__init__(daemon=True)
+        self.thread_id = thread_id
+        self.interval = interval
+        self.samples = 0
+        self.self_counts = Counter()
+        self.total_counts = Counter()
+        self._stop_event = threading.Event()
+
+    def run(self):
+        me = threading.get_ident()
+        while not self._stop_event.wait(self.interval):
+            frames = sys._current_frames()
+            if self.thread_id is not None:
+                frames = {self.thread_id: frames.get(self.thread_id)}
+            for thread_id, frame in frames.items():
+                if frame is None or thread_id == me:
+                    continue
+                if os.path.basename(frame.f_code.co_filename) in IDLE_MODULES:
+                    continue
+                self._sample(frame)
+
+    def _sample(self, frame):
+        self.samples += 1
+        self.self_counts[self._key(frame)] += 1
+        seen = set()
+        while frame is not None:
+            key = self._key(frame)
+            if key not in seen:
+                self.total_counts[key] += 1
+                seen.add(key)
+            frame = frame.f_back
+
+    @staticmethod
+    def _key(frame):
+        code = frame.f_code
+        return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+
+    def top(self, limit=20, cumulative=False):
+        counts = self.total_counts if cumulative else self.self_counts
+        return [(name, count / self.samples if self.samples else 0.0)
+                for name, count in counts.most_common(limit)]
+
+class JobProfile:
+    def __init__(self, name):
+        self.name = name
+        self.started = datetime.now()
+        self.wall_seconds = 0.0
+        self.cpu_seconds = 0.0
+        self.peak_bytes = 0
+        self.rss_before = None
+        self.rss_after = None
+        self.top_allocators = []
+        self.hot_functions = []
+        self.hot_cumulative = []
+        self.samples = 0
+        self.path = None
+
+    def as_dict(self):
+        return {
+            'name': self.name,
+            'started': self.started.isoformat(),
+            'wall_seconds': self.wall_seconds,
+            'cpu_seconds': self.cpu_seconds,
+            'python_peak_bytes': self.peak_bytes,
+            'rss_before': self.rss_before,
+            'rss_after': self.rss_after,
+            'samples': self.samples,
+            'top_allocators': self.top_allocators,
+            'hot_functions': self.hot_functions,
+            'hot_cumulative': self.hot_cumulative,
+        }
+
+    def summary(self):
+        return (f"{self.name}: {self.wall_seconds:.2f}s wall, {self.cpu_seconds:.2f}s CPU, "
+                f"Python peak {self.peak_bytes / MB:.1f} MB")
+
+    def write(self, directory=None):
+        directory = directory or PROFILE_DIR
+        os.makedirs(directory, exist_ok=True)
+        base = os.path.join(directory, f"{self.started.strftime('%Y%m%d_%H%M%S_%f')}_{self.name}")
+        with open(base + '.json', 'w') as f:
+            json.dump(self.as_dict(), f, indent=2)
+
+        lines = [self.summary()]
+        if self.rss_before is not None and self.rss_after is not None:
+            lines.append(f"RSS {self.rss_before / MB:.1f} MB -> {self.rss_after / MB:.1f} MB "
+                         "(includes native model buffers tracemalloc cannot see)")
+        lines.append("")
+        lines.append("Top allocators (net, by line):")
+        for entry in self.top_allocators:
+            lines.append(f"  {entry['size'] / 1024:10.1f} KiB  {entry['count']:7d} blocks  {entry['where']}")
+        lines.append("")
+        lines.append(f"Hot functions, self time ({self.samples} samples):")
+        for name, share in self.hot_functions:
+            lines.append(f"  {share * 100:5.1f}%  {name}")
+        lines.append("")
+        lines.append("Hot functions, including callees:")
+        for name, share in self.hot_cumulative:
+            lines.append(f"  {share * 100:5.1f}%  {name}")
+        with open(base + '.txt', 'w') as f:
+            f.write("\n".join(lines) + "\n")
+        self.path = base + '.txt'
+        return self.path
+
+# tracemalloc is process-wide: the first profiled job starts it, the last
+# one stops it, and every job keeps its own peak. Before the global peak is
+# reset for a new job it is folded into the jobs that were already running.
+_trace_lock = threading.Lock()
+_traced_jobs = []
+_owns_tracing = False
+
+def _fold_peak():
+    peak = tracemalloc.get_traced_memory()[1]
+    for profile in _traced_jobs:
+        profile.peak_bytes = max(profile.peak_bytes, peak)
+    tracemalloc.reset_peak()
+
+def _begin_tracing(profile):
+    global _owns_tracing
+    with _trace_lock:
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(10)
+            _owns_tracing = True
+        _fold_peak()
+        _traced_jobs.append(profile)
+        return tracemalloc.take_snapshot()
+
+def _end_tracing(profile):
+    global _owns_tracing
+    with _trace_lock:
+        _fold_peak()
+        _traced_jobs.remove(profile)
+        snapshot = tracemalloc.take_snapshot()
+        if not _traced_jobs and _owns_tracing:
+            tracemalloc.stop()
+            _owns_tracing = False
+        return snapshot
+
+@contextmanager
+def profile_job(name, force=False, write=True, top=15):
+    """Profile the enclosed job when profiling is enabled.
+
+    Yields a JobProfile (or None when disabled). Memory is tracked with
+    tracemalloc snapshots and CPU with a SamplingProfiler over all busy
+    threads; artifacts are written to ``profiles/``. Jobs may nest or
+    overlap; each reports the peak reached while it was running.
+    """
+    if not (force or _enabled):
+        yield None
+        return
+
+    profile = JobProfile(name)
+    before = _begin_tracing(profile)
+    profile.rss_before = current_rss()
+
+    sampler = SamplingProfiler()
+    sampler.start()
+    wall_start = time.perf_counter()
+    cpu_start = time.process_time()
+    try:
+        yield profile
+    finally:
+        profile.wall_seconds = time.perf_counter() - wall_start
+        profile.cpu_seconds = time.process_time() - cpu_start
+        sampler.stop()
+
+        after = _end_tracing(profile)
+        profile.rss_after = current_rss()
+
+        filters = [tracemalloc.Filter(False, tracemalloc.__file__)]
+        stats = after.filter_traces(filters).compare_to(before.filter_traces(filters), 'lineno')
+        profile.top_allocators = [
+            {'where': str(stat.traceback[0]), 'size': stat.size_diff, 'count': stat.count_diff}
+            for stat in sorted(stats, key=lambda s: s.size_diff, reverse=True)[:top]
+        ]
+        profile.samples = sampler.samples
+        profile.hot_functions = sampler.top(top)
+        profile.hot_cumulative = sampler.top(top, cumulative=True)
+
+        if write:
+            path = profile.write()
+            print(f"Profile written to {path}: {profile.summary()}")
+
+def check_budget(seconds, budget_mb, sample_rate=44100, backend=None):
+    """Record-to-features path for a fixed clip; returns (ok, profile)"""
+    import numpy as np
+    from features import FeatureStream
+
+    rng = np.random.default_rng(0)
+    block = sample_rate // 10
+    with profile_job(f"budget_{seconds:g}s", force=True, write=False) as profile:
+        features = FeatureStream(sample_rate)
+        for _ in range(int(seconds * 10)):
+            features.feed((0.05 * rng.standard_normal(block)).astype(np.float32))
+        audio, mel = features.finish()
+        if backend is not None:
+            backend.transcribe_features(audio, mel)
+    return profile.peak_bytes <= budget_mb * MB, profile
+
+def main():
+    parser = argparse.ArgumentParser(description="Peak-allocation regression check for a fixed-length clip")
+    parser.add_argument('--seconds', type=float, default=30.0, help="Clip length")
+    parser.add_argument('--budget-mb', type=float, default=24.0, help="Allowed Python peak allocation")
+    parser.add_argument('--backend', default=None, choices=['whisper', 'mlx'],
+                        help="Also decode the clip with this backend")
+    parser.add_argument('--model', default=None)
+    args = parser.parse_args()
+
+    backend = None
+    if args.backend:
+        from backends import create_backend
+        backend = create_backend(args.backend, args.model)
+
+    ok, profile = check_budget(args.seconds, args.budget_mb, backend=backend)
+    path = profile.write()
+    print(profile.summary())
+    print(f"Budget {args.budget_mb:.1f} MB: {'OK' if ok else 'EXCEEDED'} (details in {path})")
+    sys.exit(0 if ok else 1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,211 @@
+import re
+import sys
+import time
+import warnings
+import threading
+import importlib
+import importlib.metadata
+from contextlib import contextmanager
+
+# Both openai-whisper and mlx-whisper drive their long-form decode loop
+# with ``tqdm.tqdm(total=content_frames, unit="frames")`` and call
+# ``pbar.update()`` once per decoded 30 s window. We swap the module's
+# ``tqdm`` for a shim that routes those updates to a per-thread hook,
+# which is where progress is reported and cancellation is checked.
+# lightning-whisper-mlx (the Streamlit app) forked the mlx loop and
+# updates once per batch of windows instead.
+BACKEND_MODULES = ('whisper.transcribe', 'mlx_whisper.transcribe', 'lightning_whisper_mlx.transcribe')
+
+# Progress totals are log-mel frames: 10 ms hops at 16 kHz
+FRAMES_PER_SECOND = 100
+
+# Live segments are read from the decode loop's private ``all_segments``
+# local. Newest release of each backend that has been checked to have it;
+# newer ones still work, with a warning, and if the name is gone segments
+# just arrive with the final result.
+SEGMENTS_CHECKED = {
+    'whisper.transcribe': ('openai-whisper', '20250625'),
+    'mlx_whisper.transcribe': ('mlx-whisper', '0.4.2'),
+    'lightning_whisper_mlx.transcribe': ('lightning-whisper-mlx', '0.0.10'),
+}
+
+_local = threading.local()
+_install_lock = threading.Lock()
+_warned = set()
+
+def _version_key(version):
+    return tuple(int(part) for part in re.findall(r'\d+', version))
+
+def _warn_once(key, message):
+    with _install_lock:
+        if key in _warned:
+            return
+        _warned.add(key)
+    warnings.warn(message, RuntimeWarning, stacklevel=3)
+
+def check_segment_support(module_name):
+    """Warn if the installed backend is newer than the one checked for ``all_segments``"""
+    if module_name not in SEGMENTS_CHECKED:
+        return
+    distribution, checked = SEGMENTS_CHECKED[module_name]
+    try:
+        installed = importlib.metadata.version(distribution)
+    except importlib.metadata.PackageNotFoundError:
+        return
+    if _version_key(installed) > _version_key(checked):
+        _warn_once(module_name, f"{distribution} {installed} is newer than {checked}, the last version "
+                                "checked for live segments; they may only appear when decoding ends")
+
+class _HookedBar:
+    def __init__(self, hook, on_segments, total):
+        self.hook = hook
+        self.on_segments = on_segments
+        self.total = total or 0
+        self.n = 0
+        self._seen = 0
+
+    def __enter__(self):
+        self.hook(self.n, self.total)
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def update(self, n=1):
+        self.n += n
+        if self.on_segments is not None:
+            self._report_segments(sys._getframe(1))
+        # May raise (e.g. JobCancelled) to abort between windows
+        self.hook(self.n, self.total)
+
+    def _report_segments(self, frame):
+        # The decode loop has just extended its ``all_segments`` list
+        segments = frame.f_locals.get('all_segments')
+        if not isinstance(segments, list):
+            module_name = frame.f_globals.get('__name__', '?')
+            _warn_once(('all_segments', module_name),
+                       f"{module_name} has no 'all_segments' list in its decode loop; "
+                       "segments will only appear when decoding ends")
+            # Don't look again for the rest of this decode
+            self.on_segments = None
+            return
+        if len(segments) > self._seen:
+            new = segments[self._seen:]
+            self._seen = len(segments)
+            self.on_segments([
+                {'start': s['start'], 'end': s['end'], 'text': s['text']} for s in new
+            ])
+
+    def close(self):
+        pass
+
+class _TqdmShim:
+    """Stands in for the ``tqdm`` module inside a backend's transcribe.py"""
+
+    def __init__(self, real):
+        self._real = real
+
+    def tqdm(self, *args, **kwargs):
+        hooks = getattr(_local, 'hooks', None)
+        if hooks:
+            hook, on_segments = hooks[-1]
+            return _HookedBar(hook, on_segments, kwargs.get('total'))
+        return self._real.tqdm(*args, **kwargs)
+
+    def __getattr__(self, name):
+        return getattr(self._real, name)
+
+def install(module_name):
+    """Route a backend's progress bar through the hooks; returns success"""
+    try:
+        module = importlib.import_module(module_name)
+    except ImportError:
+        return False
+    check_segment_support(module_name)
+    with _install_lock:
+        current = getattr(module, 'tqdm', None)
+        if current is None:
+            return False
+        if not isinstance(current, _TqdmShim):
+            module.tqdm = _TqdmShim(current)
+    return True
+
+def install_all():
+    return [name for name in BACKEND_MODULES if install(name)]
+
+@contextmanager
+def watch_progress(hook, on_segments=None):
+    """Call ``hook(done_frames, total_frames)`` after every decoded window.
+
+    ``on_segments(segments)`` first receives the segments that window
+    produced, as dicts with ``start``, ``end`` and ``text``. Hooks are per
+    thread and nest, so a job started from inside another job's hook
+    reports to its own hook.
+    """
+    install_all()
+    hooks = getattr(_local, 'hooks', None)
+    if hooks is None:
+        hooks = _local.hooks = []
+    hooks.append((hook, on_segments))
+    try:
+        yield
+    finally:
+        hooks.pop()
+
+def format_duration(seconds):
+    minutes, seconds = divmod(int(round(seconds)), 60)
+    return f"{minutes}:{seconds:02d}"
+
+class ProgressEstimate:
+    """Share of audio decoded and time left, from the measured real-time factor
+
+    ``key`` names what decodes the job, e.g. ``('whisper', 'base')``; until
+    the first window of a new job is done its ETA is seeded from the latest
+    decode in this process with the same key. Unkeyed jobs are not seeded.
+    """
+
+    _last_rtf = {}
+
+    def __init__(self, key=None):
+        self.key = key
+        self.fraction = 0.0
+        self.total_seconds = None
+        self.rtf = None
+        self.paused = 0.0
+        self._started = None
+
+    @classmethod
+    def last_rtf(cls, key):
+        return cls._last_rtf.get(key)
+
+    def update(self, done, total):
+        now = time.perf_counter()
+        if self._started is None:
+            # First call comes as the decode loop starts, with done == 0
+            self._started = now
+        if not total:
+            return
+        self.fraction = min(done / total, 1.0)
+        self.total_seconds = total / FRAMES_PER_SECOND
+        if done > 0:
+            elapsed = now - self._started - self.paused
+            self.rtf = max(elapsed, 0.0) / (done / FRAMES_PER_SECOND)
+            if self.key is not None:
+                ProgressEstimate._last_rtf[self.key] = self.rtf
+
+    def pause(self, seconds):
+        # Time spent running other jobs inline is not this job's decode time
+        self.paused += seconds
+
+    def eta(self):
+        rtf = self.rtf if self.rtf is not None else ProgressEstimate.last_rtf(self.key)
+        if rtf is None or self.total_seconds is None:
+            return None
+        return rtf * self.total_seconds * (1.0 - self.fraction)
+
+    def text(self):
+        text = f"{self.fraction * 100:.0f}%"
+        eta = self.eta()
+        if eta is not None and self.fraction < 1.0:
+            text += f", about {format_duration(eta)} left"
+        return text
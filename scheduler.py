@@ -0,0 +1,283 @@
+import heapq
+import itertools
+import threading
+import time
+from progress import watch_progress, ProgressEstimate
+
+# Priority classes: lower runs first
+INTERACTIVE = 0
+BATCH = 1
+PRIORITY_NAMES = {INTERACTIVE: 'interactive', BATCH: 'batch'}
+
+# Recordings shorter than this are treated as interactive dictation
+INTERACTIVE_MAX_SECONDS = 60.0
+
+QUEUED = 'queued'
+RUNNING = 'running'
+PAUSED = 'paused'
+DONE = 'done'
+FAILED = 'failed'
+CANCELLED = 'cancelled'
+
+class JobCancelled(Exception):
+    pass
+
+class SessionQueueFull(Exception):
+    pass
+
+def priority_for(audio_seconds):
+    return INTERACTIVE if audio_seconds <= INTERACTIVE_MAX_SECONDS else BATCH
+
+class TranscriptionJob:
+    """A unit of work for the JobScheduler.
+
+    ``fn(job)`` does the transcription and returns its result. Backend
+    decode loops report progress through ``watch_progress``; at every
+    window boundary the job checks for cancellation and lets waiting
+    interactive jobs run first. ``model`` names what decodes it, e.g.
+    ``('whisper', 'base')``, so its ETA starts from that model's last speed.
+    """
+
+    _ids = itertools.count(1)
+
+    def __init__(self, fn, priority=INTERACTIVE, name=None, audio_seconds=None, callback=None,
+                 session=None, on_segments=None, model=None):
+        self.id = next(self._ids)
+        self.fn = fn
+        # Jobs from different sessions (users) are served round-robin
+        self.session = session
+        # Called with the job once it is done, failed or cancelled
+        self.callback = callback
+        self.priority = priority
+        self.name = name or f"Job {self.id}"
+        self.audio_seconds = audio_seconds
+        self.state = QUEUED
+        self.progress = 0.0
+        self.estimate = ProgressEstimate(model)
+        # Segments decoded so far; ``on_segments`` sees each batch as it arrives
+        self.segments = []
+        self.on_segments = on_segments
+        self.result = None
+        self.error = None
+        self.submitted_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.scheduler = None
+        self.round = 0
+        self._cancel_event = threading.Event()
+        self._done_event = threading.Event()
+
+    @property
+    def cancelled(self):
+        return self._cancel_event.is_set()
+
+    @property
+    def finished(self):
+        return self.state in (DONE, FAILED, CANCELLED)
+
+    def cancel(self):
+        self._cancel_event.set()
+        if self.scheduler is not None:
+            self.scheduler.cancel(self)
+
+    def wait(self, timeout=None):
+        return self._done_event.wait(timeout)
+
+    def report(self, done, total):
+        self.estimate.update(done, total)
+        if total:
+            self.progress = min(done / total, 1.0)
+
+    def add_segments(self, segments):
+        self.segments.extend(segments)
+        if self.on_segments is not None:
+            self.on_segments(segments)
+
+    def progress_text(self):
+        return self.estimate.text()
+
+    def checkpoint(self, done=None, total=None):
+        # Called between decode windows
+        if total is not None:
+            self.report(done, total)
+        if self.cancelled:
+            raise JobCancelled(self.name)
+        if self.scheduler is not None and self.priority > INTERACTIVE:
+            paused_at = time.perf_counter()
+            self.scheduler.yield_to_interactive(self)
+            self.estimate.pause(time.perf_counter() - paused_at)
+        if self.cancelled:
+            raise JobCancelled(self.name)
+
+    def describe(self):
+        text = f"{self.name} ({PRIORITY_NAMES.get(self.priority, self.priority)}): {self.state}"
+        if self.state in (RUNNING, PAUSED) and self.progress:
+            text += f" {self.progress_text()}"
+        return text
+
+class JobScheduler:
+    """Priority queue of transcription jobs served by a small worker pool.
+
+    Interactive jobs always start before batch jobs. A running batch job
+    pauses at its next decode-window boundary and runs any waiting
+    interactive jobs inline on its own thread, so short dictations never
+    wait for a long recording to finish.
+
+    Within a priority class, jobs are ordered by per-session round: a
+    session's n-th outstanding job waits behind every other session's
+    first, so one user queueing many clips cannot starve the others.
+    ``workers`` bounds how many decodes run at once and
+    ``max_per_session`` how many jobs one session may have outstanding.
+    """
+
+    def __init__(self, workers=1, on_change=None, max_per_session=None):
+        self.on_change = on_change
+        self.max_per_session = max_per_session
+        self._heap = []
+        self._seq = itertools.count()
+        # Round of the last job started, and the last round given to each session
+        self._served_round = 0
+        self._session_rounds = {}
+        self._outstanding = {}
+        self._running = []
+        self._lock = threading.Condition()
+        self._closed = False
+        self._threads = [
+            threading.Thread(target=self._worker, daemon=True, name=f"transcription-{i}")
+            for i in range(workers)
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def submit(self, job):
+        with self._lock:
+            outstanding = self._outstanding.get(job.session, 0)
+            if self.max_per_session and job.session is not None and outstanding >= self.max_per_session:
+                raise SessionQueueFull(f"{job.session} already has {outstanding} transcriptions queued")
+            self._outstanding[job.session] = outstanding + 1
+            job.scheduler = self
+            job.round = max(self._session_rounds.get(job.session, 0), self._served_round) + 1
+            self._session_rounds[job.session] = job.round
+            heapq.heappush(self._heap, (job.priority, job.round, next(self._seq), job))
+            self._lock.notify()
+        self._changed()
+        return job
+
+    def cancel(self, job):
+        with self._lock:
+            # A job already popped but not yet marked running is _run's to finish
+            queued = any(entry[-1] is job for entry in self._heap)
+            if queued:
+                self._heap = [entry for entry in self._heap if entry[-1] is not job]
+                heapq.heapify(self._heap)
+        if queued:
+            self._finish(job, CANCELLED)
+        # Running jobs stop at their next checkpoint
+        job._cancel_event.set()
+
+    def queued(self):
+        with self._lock:
+            return [entry[-1] for entry in sorted(self._heap, key=lambda entry: entry[:3])]
+
+    def running(self):
+        with self._lock:
+            return list(self._running)
+
+    def position(self, job):
+        """0 while running, 1.. while waiting, None once finished"""
+        if job.state in (RUNNING, PAUSED):
+            return 0
+        queued = self.queued()
+        return queued.index(job) + 1 if job in queued else None
+
+    def status_text(self):
+        running = self.running()
+        queued = self.queued()
+        if not running and not queued:
+            return "No transcriptions queued"
+        parts = [job.describe() for job in running]
+        if queued:
+            parts.append(f"{len(queued)} waiting")
+        return "; ".join(parts)
+
+    def shutdown(self):
+        with self._lock:
+            self._closed = True
+            self._lock.notify_all()
+
+    def _changed(self):
+        if self.on_change is not None:
+            self.on_change()
+
+    def _worker(self):
+        while True:
+            with self._lock:
+                while not self._heap and not self._closed:
+                    self._lock.wait()
+                if self._closed:
+                    return
+                job = self._pop()
+            self._run(job)
+
+    def yield_to_interactive(self, job):
+        # Run waiting interactive jobs inline, then resume ``job``
+        while True:
+            with self._lock:
+                if not self._heap or self._heap[0][0] > INTERACTIVE:
+                    return
+                urgent = self._pop()
+            job.state = PAUSED
+            self._changed()
+            self._run(urgent)
+            job.state = RUNNING
+            self._changed()
+
+    def _pop(self):
+        # Caller holds the lock
+        job = heapq.heappop(self._heap)[-1]
+        self._served_round = max(self._served_round, job.round)
+        return job
+
+    def _run(self, job):
+        if job.cancelled:
+            self._finish(job, CANCELLED)
+            return
+        job.state = RUNNING
+        job.started_at = time.time()
+        with self._lock:
+            self._running.append(job)
+        self._changed()
+        try:
+            with watch_progress(job.checkpoint, job.add_segments):
+                job.result = job.fn(job)
+            self._finish(job, DONE)
+        except JobCancelled:
+            self._finish(job, CANCELLED)
+        except Exception as e:
+            job.error = e
+            self._finish(job, FAILED)
+        finally:
+            with self._lock:
+                if job in self._running:
+                    self._running.remove(job)
+            self._changed()
+
+    def _finish(self, job, state):
+        with self._lock:
+            if job.finished:
+                return
+            job.state = state
+            remaining = self._outstanding.get(job.session, 1) - 1
+            if remaining > 0:
+                self._outstanding[job.session] = remaining
+            else:
+                self._outstanding.pop(job.session, None)
+                if self._session_rounds.get(job.session, 0) <= self._served_round:
+                    self._session_rounds.pop(job.session, None)
+        job.finished_at = time.time()
+        if state == DONE:
+            job.progress = 1.0
+        job._done_event.set()
+        if job.callback is not None:
+            job.callback(job)
+        self._changed()
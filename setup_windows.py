@@ -61,6 +61,7 @@ wavio
 pillow
 pyperclip
 tqdm
+psutil
 """)
     
     try:
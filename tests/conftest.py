@@ -0,0 +1,55 @@
+import os
+import sys
+import types
+import numpy as np
+import pytest
+
+# The modules live flat at the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import progress
+from features import N_SAMPLES
+
+WINDOWS = 3
+
+# Shaped like the long-form loop in whisper/transcribe.py: mel up front,
+# one tqdm update per decoded window right after extending all_segments
+DECODE_LOOP = '''
+def transcribe(audio):
+    mel = log_mel_spectrogram(audio, 80, padding=N_SAMPLES)
+    frames = mel.shape[1]
+    {segments} = []
+    with tqdm.tqdm(total=frames, unit="frames") as pbar:
+        for i in range(WINDOWS):
+            {segments}.append({{'start': float(i), 'end': float(i + 1), 'text': f"window {{i}}"}})
+            pbar.update(frames // WINDOWS)
+    return {{'text': f"{{frames}} frames", 'segments': {segments}}}
+'''
+
+class _Bar:
+    def __init__(self, total=None, **kwargs):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def update(self, n=1):
+        pass
+
+@pytest.fixture
+def make_decoder(monkeypatch):
+    """Registers a fake backend transcribe module whose progress bar watch_progress hooks"""
+    def make(name='fake_decoder', segments='all_segments'):
+        module = types.ModuleType(name)
+        module.tqdm = types.SimpleNamespace(tqdm=_Bar)
+        module.log_mel_spectrogram = lambda audio, n_mels=80, padding=0: np.zeros((n_mels, 0), np.float32)
+        module.N_SAMPLES = N_SAMPLES
+        module.WINDOWS = WINDOWS
+        exec(DECODE_LOOP.format(segments=segments), module.__dict__)
+        monkeypatch.setitem(sys.modules, name, module)
+        monkeypatch.setattr(progress, 'BACKEND_MODULES', progress.BACKEND_MODULES + (name,))
+        return module
+    return make
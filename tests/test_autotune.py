@@ -0,0 +1,21 @@
+import numpy as np
+import soundfile as sf
+import autotune
+
+def test_failed_baseline_rejects_every_candidate(monkeypatch, tmp_path):
+    fixture = str(tmp_path / 'speech.wav')
+    sf.write(fixture, np.zeros(16000, np.float32), 16000)
+    measured = []
+
+    def measure(backend, model, settings, fixture, repeat=2):
+        measured.append(settings)
+        if settings == autotune.BASELINES['mlx']:
+            raise RuntimeError("out of memory")
+        return {'decode_seconds': 0.1, 'total_seconds': 0.2, 'peak_rss_mb': 1.0, 'text': "anything"}
+
+    monkeypatch.setattr(autotune, 'measure', measure)
+    best, rows = autotune.autotune('mlx', 'tiny', fixture, budget_mb=1024)
+
+    assert best is None
+    assert measured == [{'fp16': True}]
+    assert rows == [{'settings': {'fp16': True}, 'error': "out of memory"}]
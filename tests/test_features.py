@@ -0,0 +1,38 @@
+import types
+import numpy as np
+import pytest
+from features import N_SAMPLES, precomputed_mel
+
+def fake_backend():
+    module = types.ModuleType('fake_transcribe')
+    module.log_mel_spectrogram = lambda audio, n_mels=80, padding=0: ('computed', len(audio))
+    return module
+
+def test_nested_file_jobs_get_their_own_mel():
+    module = fake_backend()
+    outer_mel = np.zeros((80, 10), np.float32)
+    inner_mel = np.ones((80, 20), np.float32)
+
+    with precomputed_mel(module, None, outer_mel, lambda m: m) as outer:
+        with precomputed_mel(module, None, inner_mel, lambda m: m) as inner:
+            assert inner is not outer
+            assert module.log_mel_spectrogram(inner, 80, padding=N_SAMPLES) is inner_mel
+            assert module.log_mel_spectrogram(outer, 80, padding=N_SAMPLES) is outer_mel
+        assert module.log_mel_spectrogram(outer, n_mels=80, padding=N_SAMPLES) is outer_mel
+
+def test_other_audio_and_other_calls_are_computed():
+    module = fake_backend()
+    audio = np.zeros(1600, np.float32)
+    mel = np.zeros((80, 10), np.float32)
+
+    with precomputed_mel(module, audio, mel, lambda m: m) as source:
+        assert np.shares_memory(source, audio)
+        # The caller's own array is not the registered object
+        assert module.log_mel_spectrogram(audio, 80, padding=N_SAMPLES) == ('computed', 1600)
+        assert module.log_mel_spectrogram(source, 80) == ('computed', 1600)
+
+def test_placeholder_with_wrong_bins_raises():
+    module = fake_backend()
+    with precomputed_mel(module, None, np.zeros((80, 10), np.float32), lambda m: m) as source:
+        with pytest.raises(ValueError):
+            module.log_mel_spectrogram(source, 128, padding=N_SAMPLES)
@@ -0,0 +1,154 @@
+import os
+import threading
+import multiprocessing
+import numpy as np
+import pytest
+import profiling
+from features import precomputed_mel
+from inference_worker import InferenceWorker, WorkerError, _Server
+from memory_budget import MB
+from scheduler import JobScheduler, TranscriptionJob, BATCH, INTERACTIVE, DONE
+
+@pytest.fixture
+def decoder(make_decoder):
+    return make_decoder()
+
+class FakeBackend:
+    def __init__(self, decoder, name, model_name):
+        self.decoder = decoder
+        self.name = name
+        self.model_name = model_name
+
+    def load(self):
+        pass
+
+    def n_mels(self):
+        return 80
+
+    def transcribe_features(self, audio, mel, **options):
+        with precomputed_mel(self.decoder, audio, mel, lambda m: m) as source:
+            return self.decoder.transcribe(source)
+
+    def transcribe_file(self, path, **options):
+        # The path stands in for the file: its length decides the mel's
+        return self.transcribe_features(None, np.zeros((80, len(path) * 100), np.float32))
+
+@pytest.fixture
+def worker(decoder):
+    """InferenceWorker talking to a _Server on a thread instead of a process"""
+    parent_conn, child_conn = multiprocessing.Pipe()
+    server = _Server(child_conn)
+    server.requests = []
+
+    def backend(name, model_name):
+        server.requests.append((name, model_name))
+        return FakeBackend(decoder, name, model_name)
+
+    server.backend = backend
+    thread = threading.Thread(target=server.serve, daemon=True)
+    thread.start()
+    worker = InferenceWorker()
+    worker.process, worker.conn = thread, parent_conn
+    worker.server = server
+    yield worker
+    parent_conn.send(('stop',))
+    thread.join(5)
+
+def test_interactive_job_runs_while_batch_job_is_decoding(worker):
+    scheduler = JobScheduler(workers=1)
+    order = []
+    short = {}
+
+    def interactive(job):
+        order.append('interactive')
+        return worker.transcribe_file('tiny', 'short', on_progress=lambda done, total: job.checkpoint())['text']
+
+    def batch(job):
+        def on_progress(done, total):
+            if done and 'job' not in short:
+                # Arrives while the batch request is paused mid-decode in the worker
+                short['job'] = scheduler.submit(TranscriptionJob(interactive, priority=INTERACTIVE))
+            job.checkpoint(done, total)
+            order.append(f"batch {done}/{total}")
+        return worker.transcribe_file('tiny', 'a long recording', on_progress=on_progress)['text']
+
+    long_job = scheduler.submit(TranscriptionJob(batch, priority=BATCH))
+    assert long_job.wait(10), long_job.state
+    assert short['job'].wait(10), short['job'].state
+    scheduler.shutdown()
+
+    assert (long_job.state, short['job'].state) == (DONE, DONE)
+    assert long_job.result == "1600 frames"
+    assert short['job'].result == "500 frames"
+    assert order[:3] == ['batch 0/1600', 'interactive', 'batch 533/1600']
+
+def test_backend_argument_reaches_the_worker(worker):
+    worker.transcribe_file('small', 'clip', backend='whisper-int8')
+    worker.transcribe_file('small', 'clip')
+
+    assert worker.server.requests == [('whisper-int8', 'small'), ('whisper', 'small')]
+
+def test_stop_does_not_wait_for_a_running_request(worker):
+    paused, release = threading.Event(), threading.Event()
+    errors = []
+
+    class Process:
+        # Stands in for the child process around the server thread
+        def __init__(self, thread):
+            self.thread = thread
+            self.terminated = False
+
+        def is_alive(self):
+            return not self.terminated and self.thread.is_alive()
+
+        def join(self, timeout=None):
+            pass
+
+        def terminate(self):
+            # The server gives up the paused request as a killed child would
+            self.terminated = True
+            worker.conn.send(('cancel',))
+
+    def on_progress(done, total):
+        paused.set()
+        release.wait(5)
+
+    def request():
+        try:
+            worker.transcribe_file('tiny', 'a long recording', on_progress=on_progress)
+        except WorkerError as e:
+            errors.append(e)
+
+    process = worker.process = Process(worker.process)
+    thread = threading.Thread(target=request)
+    thread.start()
+    assert paused.wait(5)
+
+    stopper = threading.Thread(target=worker.stop)
+    stopper.start()
+    stopper.join(2)
+    assert not stopper.is_alive()
+    assert process.terminated
+
+    release.set()
+    thread.join(5)
+    assert len(errors) == 1 and "stopped" in str(errors[0])
+    worker.process = process.thread
+
+def test_worker_reports_its_own_memory_and_profiles(worker, monkeypatch, tmp_path):
+    monkeypatch.setattr(profiling, 'PROFILE_DIR', str(tmp_path))
+    assert worker.memory_text is None
+    assert 'profile' not in worker.transcribe_file('tiny', 'clip')
+    # The server's governor (budget and models), not this process's
+    assert worker.memory_text.startswith("Memory:")
+    assert f"/ {worker.server.governor.budget / MB:.0f} MB" in worker.memory_text
+
+    # The GUI only decides whether to profile; the decode is profiled in the worker
+    monkeypatch.setattr(profiling, '_enabled', True)
+    result = worker.transcribe_file('tiny', 'clip')
+    assert os.path.dirname(result['profile']) == str(tmp_path)
+    assert result['profile_summary'].startswith("transcribe_whisper_tiny:")
+
+def test_worker_gets_its_share_of_the_budget():
+    parent_conn, child_conn = multiprocessing.Pipe()
+    assert _Server(child_conn, budget=300 * MB).governor.budget == 300 * MB
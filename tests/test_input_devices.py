@@ -0,0 +1,20 @@
+import time
+from input_devices import SimulatedInputStream
+
+def test_overrun_threshold_scales_with_speed():
+    blocks = []
+
+    def slow_callback(indata, frames, time_info, status):
+        blocks.append(bool(status.input_overflow))
+        if len(blocks) == 1:
+            # Two blocks of wall time at 4x, i.e. half a block of audio time
+            time.sleep(2 * 256 / (8000 * 4))
+
+    stream = SimulatedInputStream(samplerate=8000, blocksize=256, speed=4.0, duration=0.5,
+                                  callback=slow_callback)
+    stream.start()
+    assert stream.finished.wait(5)
+    stream.stop()
+
+    assert stream.overflows >= 1
+    assert blocks[1]
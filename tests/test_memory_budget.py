@@ -0,0 +1,32 @@
+import memory_budget
+from memory_budget import MemoryGovernor, MB
+
+def test_eviction_stops_when_rss_does_not_drop(monkeypatch):
+    # RSS stays put however much is evicted, e.g. a decode still holds the model
+    monkeypatch.setattr(memory_budget, 'current_rss', lambda: 950 * MB)
+    governor = MemoryGovernor(budget=1000 * MB)
+    for name in ('a', 'b', 'c'):
+        governor.models[name] = (object(), 100 * MB)
+
+    governor.get_model('d', lambda name: name)
+
+    assert list(governor.models) == ['b', 'c', 'd']
+
+def test_eviction_continues_while_it_frees_memory(monkeypatch):
+    rss = {'value': 900 * MB}
+    monkeypatch.setattr(memory_budget, 'current_rss', lambda: rss['value'])
+    governor = MemoryGovernor(budget=1000 * MB)
+    for name in ('a', 'b', 'c'):
+        governor.models[name] = (object(), 100 * MB)
+    original_evict = governor.evict_lru
+
+    def evict():
+        name = original_evict()
+        rss['value'] -= 100 * MB
+        return name
+
+    monkeypatch.setattr(governor, 'evict_lru', evict)
+    governor.get_model('d', lambda name: name)
+
+    # 900 -> 800 -> 700 MB leaves room for another 100 MB model under 90% of the budget
+    assert list(governor.models) == ['c', 'd']
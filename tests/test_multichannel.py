@@ -0,0 +1,48 @@
+import time
+import threading
+import numpy as np
+from multichannel import transcribe_channels
+
+def test_decodes_never_overlap_but_front_ends_do():
+    audio = np.random.default_rng(0).normal(0, 0.1, (1600, 3)).astype(np.float32)
+    lock = threading.Lock()
+    state = {'front_ends': 0, 'max_front_ends': 0, 'decoding': 0, 'max_decoding': 0}
+    barrier = threading.Barrier(3, timeout=5)
+
+    def front_end(mono):
+        with lock:
+            state['front_ends'] += 1
+            state['max_front_ends'] = max(state['max_front_ends'], state['front_ends'])
+        # Only passes once every channel's front end is running at the same time
+        barrier.wait()
+        with lock:
+            state['front_ends'] -= 1
+        return float(mono[0])
+
+    def transcribe(first_sample):
+        with lock:
+            state['decoding'] += 1
+            state['max_decoding'] = max(state['max_decoding'], state['decoding'])
+        time.sleep(0.01)
+        with lock:
+            state['decoding'] -= 1
+        return {'segments': [{'start': first_sample, 'end': first_sample, 'text': f"{first_sample:.4f}"}]}
+
+    segments = transcribe_channels(audio, transcribe, front_end=front_end)
+
+    assert state['max_front_ends'] == 3
+    assert state['max_decoding'] == 1
+    assert [s['speaker'] for s in segments] == [f"Speaker {i + 1}" for i in np.argsort(audio[0])]
+
+def test_silent_channels_are_skipped():
+    audio = np.zeros((1600, 2), dtype=np.float32)
+    audio[:, 1] = 0.1
+    seen = []
+
+    def transcribe(mono):
+        seen.append(mono)
+        return {'segments': [{'start': 0.0, 'end': 1.0, 'text': ' hello '}]}
+
+    segments = transcribe_channels(audio, transcribe)
+    assert len(seen) == 1
+    assert segments == [{'speaker': 'Speaker 2', 'start': 0.0, 'end': 1.0, 'text': 'hello'}]
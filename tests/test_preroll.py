@@ -0,0 +1,45 @@
+import time
+import numpy as np
+import input_devices
+from audio_buffer import RingBuffer
+from preroll import WarmInput
+
+class CountingSource:
+    """Every sample is its own index, so gaps and repeats are easy to spot"""
+
+    def __init__(self):
+        self.position = 0
+
+    def read(self, frames, channels, sample_rate):
+        block = np.arange(self.position, self.position + frames, dtype=np.float32)
+        self.position += frames
+        return np.repeat(block[:, np.newaxis], channels, axis=1)
+
+def test_preroll_joins_the_capture_without_losing_a_block():
+    input_devices.use_simulated_input(CountingSource(), speed=4.0)
+    try:
+        warm = WarmInput(8000, preroll_seconds=0.5, blocksize=256)
+        warm.open()
+        time.sleep(0.3)
+        ring = RingBuffer(8000 * 5)
+        preroll = warm.begin_capture(ring)
+        time.sleep(0.1)
+        warm.end_capture()
+        warm.close()
+    finally:
+        input_devices.use_real_input()
+
+    captured = ring.read()
+    samples = np.concatenate((preroll[:, 0], captured[:, 0]))
+    assert len(preroll) == 4000
+    assert len(captured) > 0
+    assert np.array_equal(samples, np.arange(samples[0], samples[0] + len(samples)))
+
+def test_begin_capture_without_blocks_does_not_hang():
+    warm = WarmInput(8000, preroll_seconds=0.5, blocksize=256)
+    ring = RingBuffer(8000)
+    started = time.perf_counter()
+    preroll = warm.begin_capture(ring)
+    assert time.perf_counter() - started < 2
+    assert len(preroll) == 0
+    assert warm._target is ring
@@ -0,0 +1,50 @@
+import threading
+import tracemalloc
+from memory_budget import MB
+from profiling import check_budget, profile_job
+
+def test_fixed_clip_stays_within_allocation_budget():
+    # Same clip and budget as `python profiling.py` defaults
+    ok, profile = check_budget(30, 24)
+    assert ok, profile.summary()
+
+def test_nested_job_keeps_outer_peak():
+    with profile_job("outer", force=True, write=False) as outer:
+        block = bytearray(32 * MB)
+        del block
+        with profile_job("inner", force=True, write=False) as inner:
+            small = bytearray(MB)
+            del small
+
+    assert outer.peak_bytes >= 32 * MB
+    assert inner.peak_bytes < 32 * MB
+    assert not tracemalloc.is_tracing()
+
+def test_overlapping_jobs_keep_tracing_until_the_last_ends():
+    main_started = threading.Event()
+    other_started = threading.Event()
+    seen = {}
+
+    def other_job():
+        # Starts first, so it is the job that turned tracing on
+        with profile_job("other", force=True, write=False) as profile:
+            other_started.set()
+            main_started.wait(5)
+            block = bytearray(16 * MB)
+            del block
+        seen['peak'] = profile.peak_bytes
+
+    thread = threading.Thread(target=other_job)
+    thread.start()
+    other_started.wait(5)
+    with profile_job("main", force=True, write=False) as main:
+        main_started.set()
+        thread.join()
+        # The other job ending must not stop tracing under this one
+        assert tracemalloc.is_tracing()
+        later = bytearray(8 * MB)
+        del later
+
+    assert seen['peak'] >= 16 * MB
+    assert main.peak_bytes >= 16 * MB
+    assert not tracemalloc.is_tracing()
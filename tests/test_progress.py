@@ -0,0 +1,61 @@
+import warnings
+import importlib.metadata
+import numpy as np
+import pytest
+import progress
+from features import precomputed_mel
+from progress import ProgressEstimate, watch_progress, check_segment_support
+
+def decode(module, frames=3000):
+    with precomputed_mel(module, None, np.zeros((80, frames), np.float32), lambda m: m) as source:
+        return module.transcribe(source)
+
+def test_segments_and_progress_from_decode_loop(make_decoder):
+    module = make_decoder()
+    calls = []
+    with watch_progress(lambda done, total: calls.append(('progress', done, total)),
+                        lambda segments: calls.append(('segments', [s['text'] for s in segments]))):
+        decode(module)
+
+    assert calls == [
+        ('progress', 0, 3000),
+        ('segments', ['window 0']), ('progress', 1000, 3000),
+        ('segments', ['window 1']), ('progress', 2000, 3000),
+        ('segments', ['window 2']), ('progress', 3000, 3000),
+    ]
+
+def test_renamed_segments_local_falls_back_with_a_warning(make_decoder):
+    module = make_decoder('renamed_decoder', segments='decoded')
+    progress_calls = []
+    segments = []
+    with pytest.warns(RuntimeWarning, match="no 'all_segments'"):
+        with watch_progress(lambda done, total: progress_calls.append(done), segments.extend):
+            result = decode(module)
+
+    assert progress_calls == [0, 1000, 2000, 3000]
+    assert segments == []
+    assert len(result['segments']) == 3
+
+def test_newer_backend_version_warns(monkeypatch):
+    monkeypatch.setattr(progress, '_warned', set())
+    monkeypatch.setattr(importlib.metadata, 'version', lambda name: '0.5.0')
+    with pytest.warns(RuntimeWarning, match="mlx-whisper 0.5.0"):
+        check_segment_support('mlx_whisper.transcribe')
+
+    monkeypatch.setattr(progress, '_warned', set())
+    monkeypatch.setattr(importlib.metadata, 'version', lambda name: '0.4.2')
+    with warnings.catch_warnings():
+        warnings.simplefilter('error')
+        check_segment_support('mlx_whisper.transcribe')
+
+def test_eta_is_seeded_per_model(monkeypatch):
+    monkeypatch.setattr(ProgressEstimate, '_last_rtf', {('whisper', 'tiny'): 0.1, ('whisper', 'medium'): 2.0})
+    tiny = ProgressEstimate(('whisper', 'tiny'))
+    medium = ProgressEstimate(('whisper', 'medium'))
+    unknown = ProgressEstimate()
+    for estimate in (tiny, medium, unknown):
+        estimate.update(0, 6000)
+
+    assert tiny.eta() == pytest.approx(6.0)
+    assert medium.eta() == pytest.approx(120.0)
+    assert unknown.eta() is None
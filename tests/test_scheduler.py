@@ -0,0 +1,61 @@
+import threading
+from scheduler import (JobScheduler, TranscriptionJob, SessionQueueFull, BATCH, INTERACTIVE,
+                       CANCELLED, DONE)
+
+def test_cancel_between_pop_and_run_finishes_once():
+    calls = []
+    scheduler = JobScheduler(workers=0, max_per_session=1)
+    job = scheduler.submit(TranscriptionJob(lambda job: "text", session='a',
+                                            callback=lambda job: calls.append((job.name, job.state))))
+    with scheduler._lock:
+        popped = scheduler._pop()
+    assert popped is job
+
+    # Still QUEUED, but no longer in the heap: _run must be the one to finish it
+    job.cancel()
+    scheduler._run(job)
+
+    assert calls == [(job.name, CANCELLED)]
+    assert scheduler._outstanding == {}
+    scheduler.submit(TranscriptionJob(lambda job: "text", session='a'))
+    try:
+        scheduler.submit(TranscriptionJob(lambda job: "text", session='a'))
+    except SessionQueueFull:
+        pass
+    else:
+        raise AssertionError("session went over max_per_session")
+
+def test_cancel_queued_job_removes_it():
+    calls = []
+    scheduler = JobScheduler(workers=0)
+    job = scheduler.submit(TranscriptionJob(lambda job: "text", callback=lambda job: calls.append(job.state)))
+    job.cancel()
+    assert scheduler.queued() == []
+    assert calls == [CANCELLED]
+
+def test_interactive_job_runs_inside_batch_checkpoint():
+    order = []
+    release = threading.Event()
+    scheduler = JobScheduler(workers=1)
+
+    def batch(job):
+        order.append('batch start')
+        release.wait(5)
+        job.checkpoint(1, 2)
+        order.append('batch end')
+        return 'batch'
+
+    def interactive(job):
+        order.append('interactive')
+        return 'interactive'
+
+    long_job = scheduler.submit(TranscriptionJob(batch, priority=BATCH))
+    while not order:
+        threading.Event().wait(0.01)
+    short_job = scheduler.submit(TranscriptionJob(interactive, priority=INTERACTIVE))
+    release.set()
+    assert long_job.wait(5) and short_job.wait(5)
+    scheduler.shutdown()
+
+    assert order == ['batch start', 'interactive', 'batch end']
+    assert (long_job.state, short_job.state) == (DONE, DONE)
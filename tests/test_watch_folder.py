@@ -0,0 +1,62 @@
+import time
+import threading
+import numpy as np
+import soundfile as sf
+import watch_folder
+from watch_folder import Debouncer, WatchFolderDaemon
+
+class FakeBackend:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.active = 0
+        self.max_active = 0
+
+    def n_mels(self):
+        return 80
+
+    def transcribe_features(self, audio, mel, **options):
+        with self.lock:
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+        time.sleep(0.02)
+        with self.lock:
+            self.active -= 1
+        return {'text': f"{mel.shape[1]} frames"}
+
+def test_workers_decode_one_file_at_a_time(tmp_path):
+    paths = []
+    for i in range(4):
+        path = tmp_path / f"clip{i}.wav"
+        sf.write(path, np.zeros(16000, dtype=np.float32), 16000)
+        paths.append(str(path))
+    backend = FakeBackend()
+    daemon = WatchFolderDaemon([str(tmp_path)], backend, workers=4)
+
+    threads = [threading.Thread(target=daemon.transcribe, args=(path,)) for path in paths]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert backend.max_active == 1
+    for path in paths:
+        with open(path[:-4] + '.txt', encoding='utf-8') as f:
+            assert f.read() == "3100 frames\n"
+
+def test_empty_files_are_dropped_until_written(tmp_path, monkeypatch):
+    monkeypatch.setattr(watch_folder, 'log', lambda message: None)
+    path = tmp_path / "empty.wav"
+    path.write_bytes(b'')
+    debouncer = Debouncer(settle_seconds=0)
+
+    debouncer.touch(str(path))
+    assert debouncer.ready() == []
+    assert debouncer.pending == {}
+
+    # A rescan of the unchanged empty file does not bring it back
+    debouncer.touch(str(path))
+    assert debouncer.pending == {}
+
+    path.write_bytes(b'RIFF')
+    debouncer.touch(str(path))
+    assert debouncer.ready() == [str(path)]
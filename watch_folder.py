@@ -0,0 +1,276 @@
+#!/usr/bin/env python3
+import os
+import sys
+import time
+import queue
+import select
+import struct
+import ctypes
+import ctypes.util
+import argparse
+import threading
+from datetime import datetime
+from backends import create_backend
+from features import file_log_mel
+
+AUDIO_EXTENSIONS = {'.wav', '.flac', '.ogg', '.aiff', '.aif'}
+
+def log(message):
+    print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] {message}", flush=True)
+
+def is_audio_file(path):
+    name = os.path.basename(path)
+    return not name.startswith('.') and os.path.splitext(name)[1].lower() in AUDIO_EXTENSIONS
+
+def sidecar_path(audio_path, output_dir=None):
+    base = os.path.splitext(os.path.basename(audio_path))[0] + '.txt'
+    return os.path.join(output_dir or os.path.dirname(audio_path), base)
+
+def needs_transcript(audio_path, output_dir=None):
+    transcript = sidecar_path(audio_path, output_dir)
+    try:
+        return os.path.getmtime(transcript) < os.path.getmtime(audio_path)
+    except OSError:
+        return True
+
+def scan(directories):
+    for directory in directories:
+        try:
+            entries = os.scandir(directory)
+        except FileNotFoundError:
+            continue
+        with entries:
+            for entry in entries:
+                if entry.is_file() and is_audio_file(entry.path):
+                    yield entry.path
+
+class InotifyWatcher:
+    """Minimal inotify binding via ctypes (Linux only)"""
+
+    IN_MODIFY = 0x00000002
+    IN_CLOSE_WRITE = 0x00000008
+    IN_MOVED_TO = 0x00000080
+    IN_CREATE = 0x00000100
+    IN_NONBLOCK = 0o4000
+    EVENT_HEADER = struct.Struct('iIII')
+
+    def __init__(self, directories):
+        if not sys.platform.startswith('linux'):
+            raise OSError("inotify is only available on Linux")
+        self.libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+        self.fd = self.libc.inotify_init1(self.IN_NONBLOCK)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self.watches = {}
+        mask = self.IN_MODIFY | self.IN_CLOSE_WRITE | self.IN_MOVED_TO | self.IN_CREATE
+        for directory in directories:
+            wd = self.libc.inotify_add_watch(self.fd, os.fsencode(directory), mask)
+            if wd < 0:
+                raise OSError(ctypes.get_errno(), f"Cannot watch {directory}")
+            self.watches[wd] = directory
+
+    def poll(self, timeout):
+        # Returns the paths touched since the last call
+        readable, _, _ = select.select([self.fd], [], [], timeout)
+        if not readable:
+            return []
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return []
+
+        paths = []
+        offset = 0
+        while offset + self.EVENT_HEADER.size <= len(data):
+            wd, _, _, length = self.EVENT_HEADER.unpack_from(data, offset)
+            offset += self.EVENT_HEADER.size
+            name = data[offset:offset + length].rstrip(b'\0')
+            offset += length
+            if name and wd in self.watches:
+                paths.append(os.path.join(self.watches[wd], os.fsdecode(name)))
+        return paths
+
+    def close(self):
+        os.close(self.fd)
+
+class PollingWatcher:
+    """Fallback watcher that rescans the directories every interval"""
+
+    def __init__(self, directories, interval=1.0):
+        self.directories = directories
+        self.interval = interval
+
+    def poll(self, timeout):
+        time.sleep(min(timeout, self.interval))
+        return list(scan(self.directories))
+
+    def close(self):
+        pass
+
+def create_watcher(directories, force_polling=False):
+    if not force_polling:
+        try:
+            return InotifyWatcher(directories)
+        except (OSError, AttributeError) as e:
+            log(f"inotify unavailable ({e}), falling back to polling")
+    return PollingWatcher(directories)
+
+class Debouncer:
+    """Holds back files until their size and mtime stop changing"""
+
+    def __init__(self, settle_seconds=2.0):
+        self.settle_seconds = settle_seconds
+        self.pending = {}  # path -> (signature, time the signature last changed)
+        self.empty = {}    # path -> signature of a file that settled at zero bytes
+
+    def touch(self, path):
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            self.pending.pop(path, None)
+            self.empty.pop(path, None)
+            return
+        signature = (st.st_size, st.st_mtime_ns)
+        if self.empty.get(path) == signature:
+            # Still the same empty file; it comes back once something writes to it
+            return
+        self.empty.pop(path, None)
+        previous = self.pending.get(path)
+        if previous is None or previous[0] != signature:
+            self.pending[path] = (signature, time.monotonic())
+
+    def ready(self):
+        now = time.monotonic()
+        settled = []
+        for path, (signature, changed_at) in list(self.pending.items()):
+            if now - changed_at < self.settle_seconds:
+                continue
+            # Stat once more: a writer may have extended the file meanwhile
+            self.touch(path)
+            if path in self.pending and self.pending[path][0] == signature:
+                del self.pending[path]
+                if signature[0] > 0:
+                    settled.append(path)
+                else:
+                    log(f"Skipping empty file {path}")
+                    self.empty[path] = signature
+        return settled
+
+class WatchFolderDaemon:
+    def __init__(self, directories, backend, output_dir=None, workers=1,
+                 queue_size=16, settle_seconds=2.0, force_polling=False):
+        self.directories = [os.path.abspath(d) for d in directories]
+        self.backend = backend
+        self.output_dir = output_dir
+        self.workers = workers
+        self.jobs = queue.Queue(maxsize=queue_size)
+        self.debouncer = Debouncer(settle_seconds)
+        self.force_polling = force_polling
+        self.in_flight = set()
+        self._lock = threading.Lock()
+        # All workers share the backend's one model, and openai-whisper keeps
+        # its KV cache in hooks on it, so only the front ends run concurrently
+        self._decode_lock = threading.Lock()
+        self._stop_event = threading.Event()
+
+    def worker(self):
+        while True:
+            path = self.jobs.get()
+            if path is None:
+                self.jobs.task_done()
+                return
+            try:
+                self.transcribe(path)
+            except Exception as e:
+                log(f"Failed to transcribe {path}: {e}")
+            finally:
+                with self._lock:
+                    self.in_flight.discard(path)
+                self.jobs.task_done()
+
+    def transcribe(self, path):
+        started = time.time()
+        mel = file_log_mel(path, self.backend.n_mels())
+        with self._decode_lock:
+            result = self.backend.transcribe_features(None, mel)
+        transcript = sidecar_path(path, self.output_dir)
+        # Write atomically so readers never see a half-written sidecar
+        temp = transcript + '.part'
+        with open(temp, 'w', encoding='utf-8') as f:
+            f.write(result['text'].strip() + '\n')
+        os.replace(temp, transcript)
+        log(f"Transcribed {path} -> {transcript} in {time.time() - started:.1f}s")
+
+    def enqueue(self, path):
+        with self._lock:
+            if path in self.in_flight:
+                return
+            self.in_flight.add(path)
+        # Blocks when the queue is full so arrivals apply backpressure
+        self.jobs.put(path)
+
+    def run(self):
+        if self.output_dir:
+            os.makedirs(self.output_dir, exist_ok=True)
+        threads = [threading.Thread(target=self.worker, daemon=True) for _ in range(self.workers)]
+        for thread in threads:
+            thread.start()
+
+        watcher = create_watcher(self.directories, self.force_polling)
+        log(f"Watching {', '.join(self.directories)} with {type(watcher).__name__}")
+
+        # Pick up anything that arrived while we were not running
+        for path in scan(self.directories):
+            self.debouncer.touch(path)
+
+        try:
+            while not self._stop_event.is_set():
+                for path in watcher.poll(timeout=0.5):
+                    if is_audio_file(path):
+                        self.debouncer.touch(path)
+                for path in self.debouncer.ready():
+                    if needs_transcript(path, self.output_dir):
+                        self.enqueue(path)
+        except KeyboardInterrupt:
+            log("Shutting down...")
+        finally:
+            watcher.close()
+            for _ in threads:
+                self.jobs.put(None)
+            for thread in threads:
+                thread.join()
+
+    def stop(self):
+        self._stop_event.set()
+
+def main():
+    default_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "recordings")
+    parser = argparse.ArgumentParser(description="Transcribe audio files as they arrive in watched folders")
+    parser.add_argument('directories', nargs='*', default=[default_dir],
+                        help="Directories to watch (default: recordings/)")
+    parser.add_argument('--backend', default='whisper', choices=['whisper', 'whisper-int8', 'mlx'])
+    parser.add_argument('--model', default=None, help="Model name or Hugging Face repo")
+    parser.add_argument('--output-dir', default=None, help="Write transcripts here instead of next to the audio")
+    parser.add_argument('--workers', type=int, default=1, help="Files read and converted to spectrograms concurrently; decodes run one at a time")
+    parser.add_argument('--queue-size', type=int, default=16, help="Maximum queued files")
+    parser.add_argument('--settle', type=float, default=2.0,
+                        help="Seconds a file must stay unchanged before it is transcribed")
+    parser.add_argument('--poll', action='store_true', help="Force polling instead of inotify")
+    args = parser.parse_args()
+
+    for directory in args.directories:
+        os.makedirs(directory, exist_ok=True)
+
+    daemon = WatchFolderDaemon(
+        args.directories,
+        create_backend(args.backend, args.model),
+        output_dir=args.output_dir,
+        workers=args.workers,
+        queue_size=args.queue_size,
+        settle_seconds=args.settle,
+        force_polling=args.poll
+    )
+    daemon.run()
+
+if __name__ == "__main__":
+    main()
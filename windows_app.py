@@ -1,40 +1,91 @@
 import sys
 import os
 import time
-import sounddevice as sd
+import traceback
+import input_devices
 import soundfile as sf
 import numpy as np
-import whisper
 import pyperclip
+import multiprocessing
 from datetime import datetime
+from memory_budget import MemoryGovernor, SpillableBuffer, default_budget
+from audio_buffer import RingBuffer
+from preroll import WarmInput, PREROLL_SECONDS
+from features import FeatureStream
+from profiling import profiling_enabled, set_profiling
+from inference_worker import InferenceWorker
+from scheduler import JobScheduler, TranscriptionJob, priority_for, DONE, CANCELLED
 from PyQt5.QtWidgets import (QApplication, QMainWindow, QPushButton, QVBoxLayout, 
                            QWidget, QLabel, QComboBox, QTextEdit, QMessageBox,
-                           QSpinBox, QHBoxLayout)
-from PyQt5.QtCore import Qt, QTimer, pyqtSignal, QThread
+                           QSpinBox, QHBoxLayout, QCheckBox)
+from PyQt5.QtCore import Qt, QTimer, pyqtSignal, QThread, QObject
+from PyQt5.QtGui import QTextCursor
+
+# Created under __main__: the spawned inference worker re-imports this
+# module as __mp_main__ and must not start a scheduler or claim a budget
+memory_governor = None
+inference_worker = None
+scheduler = None
+
+# Share of the memory budget kept by this process for capture buffers;
+# the models live in the inference worker, which gets the rest
+GUI_BUDGET_SHARE = 0.25
+
+# Model choices ending in this run int8-quantized weights on CPU
+INT8_SUFFIX = '-int8'
+
+def parse_model_choice(choice):
+    """'small-int8' -> ('whisper-int8', 'small'); 'small' -> ('whisper', 'small')"""
+    if choice.endswith(INT8_SUFFIX):
+        return 'whisper-int8', choice[:-len(INT8_SUFFIX)]
+    return 'whisper', choice
 
 class AudioRecorder(QThread):
     finished = pyqtSignal(str)
     error = pyqtSignal(str)
     
-    def __init__(self, save_dir):
+    def __init__(self, save_dir, channels=1, warm_input=None):
         super().__init__()
         self.save_dir = save_dir
+        self.warm_input = warm_input
+        self.channels = warm_input.channels if warm_input is not None else channels
         self.sample_rate = 16000
         self.dtype = np.float32
         self.recording = False
-        self.frames = []
+        self.frames = None
+        self.ring = None
+        # Log-mel features computed while recording (mono only)
+        self.feature_stream = None
+        self.features = None
+    
+    def add_frames(self, audio_data):
+        self.frames.append(audio_data)
+        if self.feature_stream is not None and len(audio_data):
+            self.feature_stream.feed(audio_data[:, 0])
     
     def run(self):
         try:
-            # Record audio
-            with sd.InputStream(samplerate=self.sample_rate, channels=1, dtype=self.dtype) as stream:
+            if self.warm_input is not None:
+                # The warm stream is already feeding self.ring; just drain it
                 while self.recording:
-                    audio_data, _ = stream.read(self.sample_rate)
-                    self.frames.append(audio_data.copy())
+                    time.sleep(0.05)
+                    self.add_frames(self.ring.read())
+                self.warm_input.end_capture()
+                self.add_frames(self.ring.read())
+            else:
+                # Record audio
+                with input_devices.InputStream(samplerate=self.sample_rate, channels=self.channels, dtype=self.dtype) as stream:
+                    while self.recording:
+                        audio_data, _ = stream.read(self.sample_rate)
+                        self.add_frames(audio_data)
+            
+            if self.feature_stream is not None:
+                self.features = self.feature_stream.finish()
+                self.feature_stream = None
             
             if len(self.frames) > 0:
-                # Concatenate all frames
-                recording = np.concatenate(self.frames, axis=0)
+                # Concatenate all frames (reading back anything spilled to disk)
+                recording = self.frames.to_array()
                 
                 # Generate filename with full path
                 timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
@@ -47,7 +98,7 @@ class AudioRecorder(QThread):
                 sf.write(filename, recording.astype(np.float32), self.sample_rate)
                 
                 # Clear memory
-                self.frames = []
+                self.frames.close()
                 del recording
                 
                 self.finished.emit(filename)
@@ -57,55 +108,91 @@ class AudioRecorder(QThread):
     
     def start_recording(self):
         self.recording = True
-        self.frames = []
+        self.frames = SpillableBuffer(memory_governor, channels=self.channels, dtype=self.dtype)
+        if self.channels == 1:
+            self.feature_stream = FeatureStream(self.sample_rate)
+        if self.warm_input is not None:
+            # Switch capture on immediately, starting with the pre-roll audio
+            self.ring = RingBuffer(self.sample_rate * 10, channels=self.channels)
+            self.add_frames(self.warm_input.begin_capture(self.ring))
         self.start()
     
     def stop_recording(self):
         self.recording = False
 
-class Transcriber(QThread):
+class Transcriber(QObject):
     finished = pyqtSignal(str)
     error = pyqtSignal(str)
     progress = pyqtSignal(str)
+    cancelled = pyqtSignal(str)
+    # Segments from each decoded window, as dicts with start/end/text
+    segments_ready = pyqtSignal(list)
     
-    def __init__(self, filename, model_name):
+    def __init__(self, filename, model_name, per_channel=False, features=None):
         super().__init__()
         self.filename = filename
         self.model_name = model_name
+        self.backend, self.base_model = parse_model_choice(model_name)
+        self.per_channel = per_channel
+        # (audio, log-mel) computed by the recorder, if available
+        self.features = features
+        self.job = None
     
-    def run(self):
-        try:
-            self.progress.emit("Loading model...")
-            model = whisper.load_model(self.model_name)
-            
-            self.progress.emit("Loading audio...")
-            audio_data, sample_rate = sf.read(self.filename)
-            
-            # Convert to mono if stereo
-            if len(audio_data.shape) > 1:
-                audio_data = audio_data.mean(axis=1)
-            
-            # Convert to float32 (what Whisper expects)
-            audio_data = audio_data.astype(np.float32)
-            
-            self.progress.emit("Transcribing...")
-            result = model.transcribe(
-                audio_data,
-                fp16=False,
-                language='en'
-            )
-            
-            # Clear memory
-            del model
-            del audio_data
-            import gc
-            gc.collect()
-            
-            self.finished.emit(result["text"])
-            
-        except Exception as e:
-            import traceback
-            self.error.emit(f"Error: {str(e)}\nTraceback: {traceback.format_exc()}")
+    def submit(self):
+        # Short dictations are interactive and preempt long batch jobs
+        audio_seconds = sf.info(self.filename).duration
+        self.job = TranscriptionJob(
+            self.transcribe,
+            priority=priority_for(audio_seconds),
+            name=os.path.basename(self.filename),
+            audio_seconds=audio_seconds,
+            callback=self.job_finished,
+            model=(self.backend, self.base_model)
+        )
+        return scheduler.submit(self.job)
+    
+    def cancel(self):
+        if self.job is not None:
+            self.job.cancel()
+    
+    def job_finished(self, job):
+        if job.state == DONE:
+            self.finished.emit(job.result)
+        elif job.state == CANCELLED:
+            self.cancelled.emit(f"Cancelled {job.name}")
+        else:
+            e = job.error
+            trace = "".join(traceback.format_exception(type(e), e, e.__traceback__))
+            self.error.emit(f"Error: {str(e)}\nTraceback: {trace}")
+    
+    def on_progress(self, done, total):
+        if total:
+            # Percentage of audio decoded and ETA from the measured real-time factor
+            self.job.report(done, total)
+            self.progress.emit(f"Transcribing {self.job.name}... {self.job.progress_text()}")
+        # Raises JobCancelled, or runs waiting interactive jobs first
+        self.job.checkpoint()
+    
+    def transcribe(self, job):
+        # The model lives in the worker process; only results come back here.
+        # Precision comes from the worker's backend, i.e. autotune.py's result.
+        options = dict(on_progress=self.on_progress, on_status=self.progress.emit,
+                       on_segments=self.segments_ready.emit, backend=self.backend, language='en')
+        if self.features is not None and not self.per_channel:
+            # Front end already ran during capture; hand over just the log-mel
+            _, mel = self.features
+            self.features = None
+            result = inference_worker.transcribe_mel(self.base_model, mel, **options)
+        elif self.per_channel and sf.info(self.filename).channels > 1:
+            # One speaker per channel; the file is read straight into shared memory
+            result = inference_worker.transcribe_channels(self.base_model, self.filename, **options)
+        else:
+            # The worker streams the file through the front end itself
+            result = inference_worker.transcribe_file(self.base_model, self.filename, **options)
+        if result.get('profile'):
+            # Opt-in profile of the decode, written by the worker to profiles/
+            self.progress.emit(f"{result['profile_summary']} ({result['profile']})")
+        return result["text"]
 
 class MainWindow(QMainWindow):
     def __init__(self):
@@ -129,11 +216,34 @@ class MainWindow(QMainWindow):
         model_label = QLabel("Model:")
         self.model_combo = QComboBox()
         self.model_combo.addItems(['tiny', 'base', 'small', 'medium'])
+        # int8 variants: quantized linear layers, about a quarter of the weight memory
+        self.model_combo.addItems([name + INT8_SUFFIX for name in ['base', 'small', 'medium']])
         self.model_combo.setCurrentText('tiny')  # Set tiny as default
         self.model_combo.currentTextChanged.connect(self.on_model_change)
         controls_layout.addWidget(model_label)
         controls_layout.addWidget(self.model_combo)
         
+        # Input channels; more than one transcribes each channel as a speaker
+        channels_label = QLabel("Channels:")
+        self.channels_spin = QSpinBox()
+        self.channels_spin.setRange(1, 8)
+        self.channels_spin.setValue(1)
+        self.channels_spin.setToolTip("Record N input channels and label each one as a separate speaker")
+        controls_layout.addWidget(channels_label)
+        controls_layout.addWidget(self.channels_spin)
+        
+        # Keep the microphone open so recording starts with pre-roll audio
+        self.always_listen_check = QCheckBox("Always listening")
+        self.always_listen_check.setToolTip(f"Keep the input open so Record includes the last {PREROLL_SECONDS:g} seconds")
+        self.always_listen_check.toggled.connect(self.on_always_listen_toggled)
+        controls_layout.addWidget(self.always_listen_check)
+        
+        # Opt-in per-job memory/CPU profiles, written to profiles/
+        self.profile_check = QCheckBox("Profile jobs")
+        self.profile_check.setChecked(profiling_enabled())
+        self.profile_check.toggled.connect(set_profiling)
+        controls_layout.addWidget(self.profile_check)
+        
         # Timer display
         self.timer_label = QLabel("00:00")
         controls_layout.addWidget(self.timer_label)
@@ -141,7 +251,7 @@ class MainWindow(QMainWindow):
         layout.addLayout(controls_layout)
         
         # Warning label
-        warning_label = QLabel("Note: Use 'tiny' model if you experience memory issues")
+        warning_label = QLabel("Note: Use 'tiny' or an -int8 model if you experience memory issues")
         warning_label.setStyleSheet("color: #FF6B6B;")
         layout.addWidget(warning_label)
         
@@ -150,6 +260,12 @@ class MainWindow(QMainWindow):
         self.record_button.clicked.connect(self.toggle_recording)
         layout.addWidget(self.record_button)
         
+        # Cancels every queued or running transcription from this window
+        self.cancel_button = QPushButton("Cancel Transcription")
+        self.cancel_button.clicked.connect(self.cancel_transcriptions)
+        self.cancel_button.setEnabled(False)
+        layout.addWidget(self.cancel_button)
+        
         # Status and progress
         self.status_label = QLabel("Ready")
         layout.addWidget(self.status_label)
@@ -157,6 +273,12 @@ class MainWindow(QMainWindow):
         self.progress_label = QLabel("")
         layout.addWidget(self.progress_label)
         
+        self.queue_label = QLabel(scheduler.status_text())
+        layout.addWidget(self.queue_label)
+        
+        self.memory_label = QLabel(self.memory_status())
+        layout.addWidget(self.memory_label)
+        
         # Transcription display
         self.transcription_text = QTextEdit()
         self.transcription_text.setReadOnly(True)
@@ -164,24 +286,79 @@ class MainWindow(QMainWindow):
         
         # Initialize variables
         self.last_recording = None
+        self.last_features = None
         self.recorder = None
-        self.transcriber = None
+        self.transcribers = []
+        # Transcriber whose segments were appended last, and those that streamed any
+        self.streaming_transcriber = None
+        self.streamed = set()
         self.recording = False
         self.recording_start_time = None
+        self.warm_input = None
         
         # Initialize timer
         self.timer = QTimer()
         self.timer.timeout.connect(self.update_timer)
+        
+        # Refresh memory usage in the status area
+        self.memory_timer = QTimer()
+        self.memory_timer.timeout.connect(self.update_memory_status)
+        self.memory_timer.start(2000)
+        
+        # Queue position and state of submitted transcriptions
+        self.queue_timer = QTimer()
+        self.queue_timer.timeout.connect(self.update_queue_status)
+        self.queue_timer.start(500)
     
     def on_model_change(self, model_name):
         if model_name in ['small', 'medium']:
             msg = QMessageBox()
             msg.setIcon(QMessageBox.Warning)
             msg.setText(f"Warning: {model_name} model requires significant memory")
-            msg.setInformativeText("This may cause issues on systems with limited RAM.\nConsider using 'tiny' or 'base' model instead.")
+            msg.setInformativeText("This may cause issues on systems with limited RAM.\n"
+                                   f"Consider '{model_name}{INT8_SUFFIX}', or the 'tiny' or 'base' model instead.")
             msg.setWindowTitle("Memory Usage Warning")
             msg.exec_()
     
+    def on_always_listen_toggled(self, checked):
+        if self.warm_input is not None:
+            self.warm_input.close()
+            self.warm_input = None
+        if checked:
+            self.warm_input = WarmInput(16000, channels=self.channels_spin.value())
+            self.warm_input.open()
+            self.status_label.setText(self.warm_input.status_text())
+        else:
+            self.status_label.setText("Ready")
+        # The warm stream is opened with a fixed channel count
+        self.channels_spin.setEnabled(not checked)
+    
+    def idle_status(self):
+        return self.warm_input.status_text() if self.warm_input is not None else "Ready"
+    
+    def memory_status(self):
+        # This process holds capture buffers; the worker reports its models
+        return f"App {memory_governor.status_text()} | {inference_worker.status_text()}"
+    
+    def update_memory_status(self):
+        self.memory_label.setText(self.memory_status())
+    
+    def update_queue_status(self):
+        text = scheduler.status_text()
+        waiting = [
+            (t.job.name, scheduler.position(t.job)) for t in self.transcribers
+            if t.job is not None and scheduler.position(t.job)
+        ]
+        if waiting:
+            text += " | " + ", ".join(f"{name}: #{position} in queue" for name, position in waiting)
+        self.queue_label.setText(text)
+        self.cancel_button.setEnabled(bool(self.transcribers))
+    
+    def cancel_transcriptions(self):
+        for transcriber in list(self.transcribers):
+            transcriber.cancel()
+        self.progress_label.setText("Cancelling...")
+    
     def update_timer(self):
         if self.recording_start_time:
             elapsed = int(time.time() - self.recording_start_time)
@@ -199,10 +376,11 @@ class MainWindow(QMainWindow):
             self.timer.start(1000)  # Update timer every second
             
             # Initialize and start recorder
-            self.recorder = AudioRecorder(self.recordings_dir)
+            self.recorder = AudioRecorder(self.recordings_dir, self.channels_spin.value(), self.warm_input)
             self.recorder.finished.connect(self.recording_finished)
             self.recorder.error.connect(self.handle_error)
             self.recorder.start_recording()
+            self.always_listen_check.setEnabled(False)
         else:
             # Stop recording
             self.recording = False
@@ -210,9 +388,12 @@ class MainWindow(QMainWindow):
             self.status_label.setText("Processing...")
             self.timer.stop()
             self.recorder.stop_recording()
+            self.always_listen_check.setEnabled(True)
     
     def recording_finished(self, filename):
         self.last_recording = filename
+        self.last_features = self.recorder.features
+        self.recorder.features = None
         self.status_label.setText("Recording complete")
         
         # Start transcription automatically
@@ -223,19 +404,67 @@ class MainWindow(QMainWindow):
             self.status_label.setText("No recording available")
             return
         
-        self.transcriber = Transcriber(self.last_recording, self.model_combo.currentText())
-        self.transcriber.finished.connect(self.transcription_finished)
-        self.transcriber.error.connect(self.handle_error)
-        self.transcriber.progress.connect(self.update_progress)
-        self.transcriber.start()
+        transcriber = Transcriber(
+            self.last_recording,
+            self.model_combo.currentText(),
+            per_channel=self.channels_spin.value() > 1,
+            features=self.last_features
+        )
+        self.last_features = None
+        transcriber.finished.connect(lambda text, t=transcriber: self.transcription_finished(t, text))
+        transcriber.segments_ready.connect(lambda segments, t=transcriber: self.append_segments(t, segments))
+        transcriber.error.connect(self.handle_error)
+        transcriber.cancelled.connect(self.transcription_cancelled)
+        transcriber.progress.connect(self.update_progress)
+        for signal in (transcriber.finished, transcriber.error, transcriber.cancelled):
+            signal.connect(lambda _, t=transcriber: self.forget_transcriber(t))
+        self.transcribers.append(transcriber)
+        transcriber.submit()
+        self.update_queue_status()
+    
+    def forget_transcriber(self, transcriber):
+        if transcriber in self.transcribers:
+            self.transcribers.remove(transcriber)
+        self.streamed.discard(transcriber)
+        if self.streaming_transcriber is transcriber:
+            self.streaming_transcriber = None
+        self.update_queue_status()
     
-    def transcription_finished(self, text):
+    def append_text(self, text):
+        # Insert at the end rather than re-rendering the whole document
+        cursor = self.transcription_text.textCursor()
+        cursor.movePosition(QTextCursor.End)
+        cursor.insertText(text)
+        self.transcription_text.setTextCursor(cursor)
+        self.transcription_text.ensureCursorVisible()
+    
+    def append_segments(self, transcriber, segments):
+        if transcriber is not self.streaming_transcriber:
+            # New job, or a preempting one interleaving with a paused job
+            timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            self.append_text(f"\n[{timestamp}] {transcriber.job.name}\n")
+            self.streaming_transcriber = transcriber
+        self.streamed.add(transcriber)
+        self.append_text("".join(segment['text'] for segment in segments))
+    
+    def transcription_finished(self, transcriber, text):
         self.record_button.setEnabled(True)
-        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        formatted_text = f"[{timestamp}]\n{text}\n\n"
-        self.transcription_text.append(formatted_text)
+        if transcriber in self.streamed:
+            # Segments are already on screen
+            self.streamed.discard(transcriber)
+            self.append_text("\n")
+            if self.streaming_transcriber is transcriber:
+                self.streaming_transcriber = None
+        else:
+            timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            formatted_text = f"[{timestamp}]\n{text}\n\n"
+            self.transcription_text.append(formatted_text)
         pyperclip.copy(text)
-        self.status_label.setText("Ready")
+        self.status_label.setText(self.idle_status())
+        self.progress_label.setText("")
+    
+    def transcription_cancelled(self, message):
+        self.status_label.setText(message)
         self.progress_label.setText("")
     
     def update_progress(self, message):
@@ -244,11 +473,25 @@ class MainWindow(QMainWindow):
     def handle_error(self, error_msg):
         self.record_button.setEnabled(True)
         QMessageBox.critical(self, "Error", error_msg)
-        self.status_label.setText("Ready")
+        self.status_label.setText(self.idle_status())
         self.progress_label.setText("")
 
 if __name__ == '__main__':
+    # The inference worker is a spawned process; needed for frozen builds
+    multiprocessing.freeze_support()
+    # One budget split between the two processes
+    budget = default_budget()
+    # Shared by the recorder threads and shown in the status area
+    memory_governor = MemoryGovernor(int(budget * GUI_BUDGET_SHARE))
+    # Whisper runs in a child process so an OOM or native crash cannot take
+    # the window down; it is restarted automatically
+    inference_worker = InferenceWorker(budget=budget - memory_governor.budget)
+    # One decode thread; interactive jobs preempt batch jobs at window boundaries
+    scheduler = JobScheduler()
+    inference_worker.start()
     app = QApplication(sys.argv)
     window = MainWindow()
     window.show()
-    sys.exit(app.exec_())
+    exit_code = app.exec_()
+    inference_worker.stop()
+    sys.exit(exit_code)